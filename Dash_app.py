@@ -1,7 +1,111 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import altair as alt
+import time
+
+from lcl.background import JobRegistry
+from lcl.cache import IngestCache
+from lcl.charts import (AXIS_RANGES, all_profit_chart, all_routes_chart, make_profit_chart, make_wow_chart, pop_heatmap,
+                        route_chart)
+from lcl.datasets import DatasetRegistry
+from lcl.export import export_workbook
+from lcl.ingest import dataset_key
+from lcl.join import PROFIT_POLICIES
+from lcl.profiling import Profiler, maybe_stage
+from lcl.store import ShipmentStore
+
+# How often the page redraws while a background build is running.
+POLL_SECONDS = 0.5
+
+
+@st.cache_resource
+def get_ingest_cache():
+    return IngestCache()
+
+
+@st.cache_resource
+def get_jobs():
+    return JobRegistry()
+
+
+@st.cache_resource
+def get_datasets():
+    return DatasetRegistry()
+
+
+def use_dataset(lease):
+    # Holding the lease in session_state keeps the dataset from being evicted;
+    # replacing it releases the one shown before.
+    old = st.session_state.get("dataset")
+    if old is not None and old is not lease:
+        old.release()
+    st.session_state["dataset"] = lease
+    return lease.cube
+
+
+def get_cube(files, profit_policy, approx_feu, profiler=None):
+    """Return (cube, running job); the cube is partial while the job runs."""
+    key = (dataset_key(files), profit_policy, approx_feu)
+    lease = st.session_state.get("dataset")
+    if lease is not None and lease.key == key:
+        return lease.cube, None
+    # Every session uploading the same workbooks shares one built dataset.
+    datasets = get_datasets()
+    lease = datasets.lease(key)
+    if lease is None:
+        # Parsing runs in the background and is shared by key, so reruns and
+        # other sessions with the same uploads pick up the same build.
+        jobs = get_jobs()
+        job = jobs.get_or_start(key, files, profit_policy, approx_feu, get_ingest_cache(), profiler=profiler)
+        if not job.done:
+            return job.cube, job
+        if job.error is not None:
+            raise job.error
+        lease = datasets.put(key, job.cube)
+        jobs.discard(key, job)
+    return use_dataset(lease), None
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def get_export(key, _cube):
+    # Keyed on the dataset, so each set of uploads is exported once.
+    return export_workbook(_cube)
+
+
+def show_progress(job):
+    icons = {"queued": "⏳", "parsing": "🔄", "done": "✅"}
+    label = f"Data Procesing... {job.files_done}/{len(job.files)} workbooks"
+    with st.status(label, expanded=job.cube is None):
+        for f in job.files:
+            sheets = list(f.sheets)
+            line = f"{icons[f.status]} {f.name}"
+            if sheets:
+                line += f" · {len(sheets)} sheets: {', '.join(sheets)}"
+            st.write(line)
+        if job.cube is not None:
+            st.caption("Charts show the workbooks finished so far.")
+
+
+@st.cache_resource
+def get_store():
+    return ShipmentStore()
+
+
+def get_history_cube(files, profit_policy):
+    store = get_store()
+    if files:
+        status_placeholder = st.empty()
+        status_placeholder.info("Data Procesing...")
+        store.ingest(files, get_ingest_cache())
+        status_placeholder.empty()
+    key = ("history", profit_policy, store.revision())
+    lease = st.session_state.get("dataset")
+    if lease is not None and lease.key == key:
+        return lease.cube
+    datasets = get_datasets()
+    lease = datasets.lease(key) or datasets.put(key, store.load_cube(policy=profit_policy))
+    return use_dataset(lease)
+
 
 st.markdown("""
     <style>
@@ -46,6 +150,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 uploaded_files = st.file_uploader("📤 上传表格", accept_multiple_files=True, type=["xlsx"])
+use_history = st.checkbox("📚 保存并使用历史数据 (Saved shipment history)")
+profit_policy = st.sidebar.selectbox("Duplicate MMSCN profit", PROFIT_POLICIES)
+approx_feu = st.sidebar.checkbox("Approximate FEU (HyperLogLog, large histories)")
+diagnostics = st.sidebar.checkbox("🩺 Diagnostics (stage timings)")
+# Stages of this rerun; the cube keeps the stages of the run that built it.
+# Resident memory rather than tracemalloc, which would slow every session.
+profiler = Profiler(trace_memory="rss", source="app") if diagnostics else None
+job = None
 time_unit = st.selectbox("View by", ["Weekly", "Monthly", "Quarterly"])
 if time_unit == "Weekly":
     time_col = "weeknum"
@@ -54,237 +166,52 @@ elif time_unit == "Monthly":
 else:
     time_col = "quarter"
 
-if uploaded_files:
-    status_placeholder = st.empty()
-    status_placeholder.info("Data Procesing...")
-    dfs = []
-    loss_dfs = []
-    for file in uploaded_files:
-        filename = file.name.lower()
-        if "rail" in filename:
-            loss_df = pd.read_excel(file)
-            if 'SHAE' in loss_df.columns:
-                loss_df["MMSCN"] = loss_df["SHAE"]
-            else:
-                loss_df["MMSCN"] = loss_df.iloc[:, 4]
-            if "Formula.7" in loss_df.columns:
-                loss_df["Total_Profit"] = pd.to_numeric(loss_df["Formula.7"], errors="coerce")
-                loss_df["Shared_Profit"] = loss_df["Total_Profit"]/2
-            loss_dfs.append(loss_df[["Shared_Profit","MMSCN"]])
-        else:
-            sheets = pd.read_excel(file, sheet_name = None)
-            for sheet_name, df in sheets.items():
-                if df.dropna(how='all').empty:
-                    continue
-                df["route"] = sheet_name 
-                if "WEEKNUM" in df.columns:
-                    df = df.drop(columns=["WEEKNUM"])
-                df["ETD"] = pd.to_datetime(df["ETD"], errors="coerce") 
-                df["weeknum"] = df["ETD"].dt.strftime("%U").astype(float).astype("Int64") + 1
-                df["month"] = df["ETD"].dt.to_period("M").astype(str)
-                df["quarter"] = df["ETD"].dt.to_period("Q").astype(str)
-                df = df.dropna(subset=["weeknum", "month", "quarter"], how="any")
-                dfs.append(df)
-    status_placeholder.empty()
-
-    df = pd.concat(dfs, ignore_index=True)
-    df = df.sort_values(by=["route", time_col])
-
-    if loss_dfs:
-        loss_df = pd.concat(loss_dfs, ignore_index=True)
-        df = pd.merge(df, loss_df, on="MMSCN", how="left")
-
-    status_placeholder.empty()
-    cbm = df.groupby(["route", time_col], as_index=False)[["Chrgb CBM"]].sum()
-
-    if "Shared_Profit" in df.columns:
-        profit_summary = df.groupby(["route", time_col], as_index=False)["Shared_Profit"].sum()
-        profit_summary = profit_summary.sort_values(time_col)
-        profit_summary["color"] = profit_summary["Shared_Profit"].apply(lambda x: "#CA001D" if x < 0 else "#498684")
-
-    unique_counts = df.drop_duplicates(subset=["route", "Containerno", "ETD", time_col])
-    weekly_unique_counts = unique_counts.groupby(["route", time_col]).size().reset_index(name="FEU")
-    total_unique_pairs = weekly_unique_counts.sum()
-
-    summary = pd.merge(cbm, weekly_unique_counts, on=["route",time_col], how="outer")
-    summary["TEU"] = summary["FEU"]*2
-    summary["AVG L/D"] = summary["Chrgb CBM"]/summary["FEU"]/76.3*100
-    summary = summary.sort_values(["route"])
+if uploaded_files or use_history:
+    if use_history:
+        cube = get_history_cube(uploaded_files, profit_policy)
+    else:
+        build_profiler = Profiler(trace_memory="rss", source="app") if diagnostics else None
+        cube, job = get_cube(uploaded_files, profit_policy, approx_feu, build_profiler)
+        if job is not None:
+            show_progress(job)
+            if cube is None:
+                time.sleep(POLL_SECONDS)
+                st.rerun()
+    if not cube.routes:
+        st.info("No shipment data yet.")
+        st.stop()
+    summary = cube.summary[time_col]
+    if cube.has_profit:
+        profit_summary = cube.profit_summary[time_col]
+    if job is None:
+        lease = st.session_state["dataset"]
+        # Built on click, on Streamlit's download thread, from the cached aggregates.
+        st.download_button(
+            "📥 导出Excel (Export to Excel)",
+            data=lambda: get_export(lease.key, lease.cube),
+            file_name="LCL_report.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore")
 
     tab1, tab2, tab3 = st.tabs(["Charts", "Profits", "Period-over-Period"])
     with tab1:
-        selected_route = st.selectbox("📍 Select a Route", ["ALL"] + sorted(summary["route"].dropna().unique()), key = "tab1")
-        if time_col == "month":
-            teu_range = 50
-            cbm_range = 1000
-        elif time_col == "quarter":
-            teu_range = 100
-            cbm_range = 3000
-        else:
-            teu_range = 20
-            cbm_range = 500
-        if selected_route == "ALL":
-            charts = []
-            for route in summary["route"].dropna().unique():
-                route_data = summary[summary["route"] == route]
-                if 'profit_summary' in locals() and not profit_summary.empty:
-                    profit_data = profit_summary[profit_summary["route"] == route]
-#-------------# TEU chart####################################################################################################################################################################
-                teu_chart = alt.Chart(route_data).mark_bar(color="#498684").encode(
-                    x=alt.X(f"{time_col}:O", title=""),
-                    y=alt.Y("TEU:Q", title="", scale=alt.Scale(domain=[0, teu_range])),
-                    tooltip=[time_col, "TEU"]
-                ).properties(
-                    title=alt.TitleParams(text=f"Vol(TEU) - {route}", fontSize=20, fontWeight="bold", anchor="start", offset=10),
-                    width=200, height=300)
-                total_teu = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
-                    text=f"TTL {route_data['TEU'].sum():.0f} TEU",
-                    color="#CA001D", fontSize=20, fontWeight="bold", align="center", dy=-30).encode(x=alt.value(0), y=alt.value(0))
-
-#-------------# CBM chart####################################################################################################################################################################
-                cbm_chart = alt.Chart(route_data).mark_bar(color="#498684").encode(
-                    x=alt.X(f"{time_col}:O", title=""),
-                    y=alt.Y("Chrgb CBM:Q", title="", scale=alt.Scale(domain=[0, cbm_range])),
-                    tooltip=[time_col, "Chrgb CBM"]
-                ).properties(
-                    title=alt.TitleParams(text=f"Vol(C.CBM) - {route}", fontSize=20, fontWeight="bold", anchor="start", offset=10),
-                    width=200, height=300
-                )
-                total_cbm = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
-                    text=f"TTL {route_data['Chrgb CBM'].sum():.0f} CBM",
-                    color="#CA001D", fontSize=20, fontWeight="bold", align="center", dy=-30
-                ).encode(x=alt.value(0), y=alt.value(0))
-                cbm_text = alt.Chart(route_data).mark_text(
-                    color="#498684", align="center", baseline="bottom", dy=-5, fontSize=8
-                ).encode(x=f"{time_col}:O", y="Chrgb CBM:Q", text=alt.Text("Chrgb CBM:Q"))
-
-#--------------#LD chart####################################################################################################################################################################
-                avg_ld = route_data["AVG L/D"].mean()
-                ld_chart = alt.Chart(route_data).mark_line(color="#498684").encode(
-                    x=alt.X(f"{time_col}:O", title=""),
-                    y=alt.Y("AVG L/D:Q", title="", scale=alt.Scale(domain=[0, 100])),
-                    tooltip=[time_col, "AVG L/D"]
-                ).properties(
-                    title=alt.TitleParams(text=f"LD(%) - {route}", fontSize=20, fontWeight="bold", anchor="start", offset=10),
-                    width=200, height=300
-                )
-                ld_points = alt.Chart(route_data).mark_point(color="#498684", filled=True, size=80).encode(
-                    x=f"{time_col}:O", y="AVG L/D:Q", tooltip=[time_col, "AVG L/D"]
-                )
-                avg_line = alt.Chart(pd.DataFrame({"y": [avg_ld]})).mark_rule(
-                    color="#E4BDC2", strokeWidth=2).encode(y="y:Q")
-                avg_text = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
-                    text=f"AVG {avg_ld:.0f} %",
-                    color="#CA001D", fontSize=20, fontWeight="bold", align="center", dy=-30
-                ).encode(x=alt.value(0), y=alt.value(0))
-                route_charts = alt.vconcat(
-                    teu_chart + total_teu,
-                    cbm_chart + total_cbm,
-                    ld_chart + ld_points + avg_line + avg_text
-                ).resolve_scale(y='independent')
-                charts.append(route_charts)
-            full_chart = alt.hconcat(*charts)
-        else:
-            data = summary[summary["route"] == selected_route]
-            if 'profit_summary' in locals() and not profit_summary.empty:
-                profit_data = profit_summary[profit_summary["route"] == selected_route]
-#-----------TEU##################################################################################################################################
-            teu_chart = alt.Chart(data).mark_bar(color = "#498684").encode(
-                x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)),
-                y=alt.Y("TEU:Q", title="", scale=alt.Scale(domain=[0, teu_range])),
-                tooltip=[time_col, "TEU"]
-                ).properties(
-                title=alt.TitleParams(text="Vol(TEU)", fontSize=20, fontWeight="bold", anchor="start", offset=10),
-                width=600,
-                height=300
-                )
-            total_teu = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
-                    text=f"TTL {data['TEU'].sum():.0f} TEU",
-                    color="#CA001D", fontSize=20, fontWeight="bold", align="center", dy=-30).encode(x=alt.value(0), y=alt.value(0))
-            teu_text = alt.Chart(data).mark_text(
-                color = "#498684",
-                align="center",
-                baseline="bottom",
-                dy=-5,
-                fontSize=12).encode(
-                x=f"{time_col}:O",
-                y="TEU:Q",
-                text=alt.Text("TEU:Q"))
-    #-------CBM##################################################################################################################################
-            cbm_chart = alt.Chart(data).mark_bar(color = "#498684").encode(
-                x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)),
-                y=alt.Y("Chrgb CBM:Q", title="", scale=alt.Scale(domain=[0, cbm_range])),
-                tooltip=[time_col, "Chrgb CBM"]
-                ).properties(
-                title=alt.TitleParams(
-            text="Vol(C.CBM)",
-            fontSize=20,
-            fontWeight="bold",
-            anchor="start",
-            offset=10
-        ),
-                width=600,
-                height=300
-                )
-            total_cbm = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
-                text=f"TTL {data["Chrgb CBM"].sum():.0f} CBM",
-                color="#CA001D",
-                fontSize=20,
-                fontWeight="bold",
-                align="center",
-                dy=-30  # 上移
-            ).encode(
-                x=alt.value(0),
-                y=alt.value(0))
-            cbm_text = alt.Chart(data).mark_text(
-                color = "#498684",
-                align="center",
-                baseline="bottom",
-                dy=-5,
-                fontSize=12).encode(
-                x=f"{time_col}:O",
-                y="Chrgb CBM:Q",
-                text=alt.Text("Chrgb CBM:Q", format=".1f"))
-
-    #-------AVG L/D##################################################################################################################################
-            avg_ld = data["AVG L/D"].mean()
-            ld_chart = alt.Chart(data).mark_line(color = "#498684").encode(
-                x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)),
-                y=alt.Y("AVG L/D:Q", title="", scale=alt.Scale(domain=[0, 100])),
-                tooltip=[time_col, "AVG L/D"]).properties(
-                title=alt.TitleParams(text="LD(%)", fontSize=20,fontWeight="bold",anchor="start",offset=10),
-                width=600,
-                height=300)
-            ld_points = alt.Chart(data).mark_point(color="#498684", filled=True, size=80).encode(
-                x=f"{time_col}:O",
-                y="AVG L/D:Q",
-                tooltip=[time_col, "AVG L/D"])
-            avg_line = alt.Chart(pd.DataFrame({"y": [avg_ld]})).mark_rule(
-                color="#E4BDC2", strokeWidth=2).encode(y="y:Q")
-            # avg_text = alt.Chart(pd.DataFrame({"y": [avg_ld]})).mark_text(
-            #     text=f"Average: {avg_ld:.1f}%",
-            #     align="left", baseline="bottom", dx=5, dy=-5, color="#CA001D").encode(x=alt.value(0), y="y:Q")
-            avg_text = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
-                text=f"AVG {data["AVG L/D"].mean():.0f} %",
-                color="#CA001D",
-                fontSize=20,
-                fontWeight="bold",
-                align="center",
-                dy=-30  # 上移
-            ).encode(
-                x=alt.value(0),
-                y=alt.value(0))
-    ##################################################################################################################################
-            full_chart = alt.vconcat(
-                teu_chart + total_teu + teu_text,
-                cbm_chart + cbm_text + total_cbm,
-                ld_chart + ld_points + avg_line + avg_text).resolve_scale(
-                    y='independent').properties(
-                    title=f"{selected_route}").configure_title( 
-                    fontSize=20,
-                    color="#498684",
-                    anchor='start')
-        st.altair_chart(full_chart, use_container_width=True)
+        selected_route = st.selectbox("📍 Select a Route", ["ALL"] + cube.routes, key = "tab1")
+        teu_range, cbm_range = AXIS_RANGES[time_col]
+        with maybe_stage(profiler, "chart_spec", rows_in=len(summary)) as stage:
+            if selected_route == "ALL":
+                # One shared dataset faceted by route, cached on the cube per period.
+                chart_key = ("all", time_col, tuple(cube.routes))
+                stage.detail["cached"] = chart_key in cube.charts
+                if chart_key not in cube.charts:
+                    cube.charts[chart_key] = all_routes_chart(summary, time_col, teu_range, cbm_range).to_dict()
+                full_chart = cube.charts[chart_key]
+            else:
+                data = summary[summary["route"] == selected_route]
+                full_chart = route_chart(data, selected_route, time_col, teu_range, cbm_range).to_dict()
+                stage.rows_out = len(data)
+        # Time until the spec is handed to the browser; drawing happens client-side.
+        with maybe_stage(profiler, "chart_send"):
+            st.vega_lite_chart(full_chart, use_container_width=True)
         with st.expander("📋 查看汇总数据(Raw Summary Data)"):
             if selected_route == "ALL":
                 show_df = summary.sort_values(["route", time_col])
@@ -294,81 +221,23 @@ if uploaded_files:
 
             
 
-    route_summary = summary.copy()
-    agg_summary = route_summary.groupby("route", as_index=False).agg({
-        "TEU": "sum",
-        "Chrgb CBM": "sum",
-        "AVG L/D": "mean"
-    })
-
-    def make_profit_chart(df, title, time_col):
-        base = alt.Chart(df).encode(x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)))
-
-        bars = base.mark_bar().encode(
-            y=alt.Y("Shared_Profit:Q", axis=alt.Axis(title="USD", titleAngle=0, titleFontSize=14,titleAnchor="start",titleY=-5)),
-            color=alt.Color("color:N", scale=None, legend=None),
-            tooltip=["route", time_col, "Shared_Profit"],
-        )
-
-        pos_text = (
-        base.mark_text(
-            dy=-5,           
-            align="center",
-            baseline="bottom", 
-            fontSize=12,
-            color="#498684",
-        )
-        .encode(
-            y=alt.Y("Shared_Profit:Q"),
-            text=alt.Text("Shared_Profit:Q", format=".0f"),
-        )
-        .transform_filter(alt.datum.Shared_Profit >= 0)
-    )
-
-        neg_text = (
-            base.mark_text(
-                dy=5,            
-                align="center",
-                baseline="top",   
-                fontSize=12,
-                color="#CA001D",
-            )
-            .encode(
-                y=alt.Y("Shared_Profit:Q"),
-                text=alt.Text("Shared_Profit:Q", format=".0f"),
-            )
-            .transform_filter(alt.datum.Shared_Profit < 0)
-        )
-
-        layered = alt.layer(bars, pos_text, neg_text).properties(
-            width=600,
-            height=150,
-            title=alt.TitleParams(
-                text=title, fontSize=20, color="#498684", anchor="start", offset=10
-            ),
-        ).resolve_scale(y="shared") 
-        return layered
+    agg_summary = cube.agg_summary[time_col]
 
     with tab2:
+        if cube.join_report is not None:
+            report = cube.join_report
+            st.caption(
+                f"MMSCN matched: {report.matched} · missing profit: {report.missing} · "
+                f"duplicated in rail files: {report.duplicated} · without shipments: {report.unused}")
         try:
-            profit_data = profit_summary[profit_summary["route"] == route]
             profit_route = st.selectbox(
                 "📍 Select a Route",
-                ["ALL"] + sorted(summary["route"].dropna().unique()),
+                ["ALL"] + cube.routes,
                 key="tab2")
             full_chart = None
             if profit_route == "ALL":
-                charts = []
-                for route in sorted(summary["route"].dropna().unique()):
-                    profit_data = profit_summary[profit_summary["route"] == route]
-                    if profit_data.empty:
-                        continue
-                    if profit_data["Shared_Profit"].dropna().abs().max() == 0:
-                        continue
-                    charts.append(make_profit_chart(profit_data, route, time_col))
-                if charts:
-                    full_chart = (alt.vconcat(*charts).resolve_scale(y="independent"))
-                else:
+                full_chart = all_profit_chart(profit_summary, cube.routes, time_col)
+                if full_chart is None:
                     st.warning("No valid charts to display.")
             else:
                 profit_data = profit_summary[profit_summary["route"] == profit_route]
@@ -381,69 +250,36 @@ if uploaded_files:
         except Exception as e:
             st.warning("⚠️ 当前未上传利润数据文件。")
     
-    def prepare_weekly_profit(profit_summary, route, time_col):
-        df = profit_summary.copy()
-        if route != "ALL":
-            df = df[df["route"] == route]
-        if time_col == "weeknum":
-            df[time_col] = pd.to_numeric(df[time_col], errors="coerce")
-        df = df.dropna(subset=[time_col])
-        df["Shared_Profit"] = pd.to_numeric(df["Shared_Profit"], errors="coerce").fillna(0)
-        df = df.groupby(time_col, as_index=False)["Shared_Profit"].sum()
-        return df.sort_values(time_col)
-
-    def compute_wow(weekly, time_col):
-        weekly = weekly.sort_values(time_col).copy()
-        weekly["wow_pct"] = weekly["Shared_Profit"].pct_change() 
-        return weekly 
-    
-    def make_wow_chart(weekly, time_col):
-        time_label = {
-            "weeknum": "Week-over-Week",
-            "month": "Month-over-Month",
-            "quarter": "Quarter-over-Quarter"
-            }.get(time_col, "Period-over-Period")
-        base = alt.Chart(weekly)
-        bars = base.mark_bar().encode(
-            x=alt.X(f"{time_col}:O", title=time_label, axis=alt.Axis(labelAngle=0)),
-            y=alt.Y("wow_pct:Q", title=f"{time_label} % Change", axis=alt.Axis(format=".0%")),
-            color=alt.condition(
-                alt.datum.wow_pct >= 0,
-                alt.value("#2ca02c"),
-                alt.value("#d62728"),
-            ),
-            tooltip=[
-                alt.Tooltip(f"{time_col}:O", title=""),
-                alt.Tooltip("Shared_Profit:Q", title="Profit", format=","),
-                alt.Tooltip("wow_pct:Q", title="Change", format=".1%")
-            ],
-        )
-        zero = alt.Chart(pd.DataFrame({"y": [0]})).mark_rule(strokeDash=[4,4], color="gray").encode(
-            y=alt.Y("y:Q")
-        )
-        labels = (
-            base.mark_text(dy=-5, align="center", baseline="bottom", fontSize=11)
-            .encode(
-                x=alt.X(f"{time_col}:O", sort=alt.EncodingSortField(field = time_col, order="ascending")),
-                y=alt.Y("wow_pct:Q"),
-                text=alt.Text("wow_pct:Q", format=".1%"),
-            )
-            .transform_filter(alt.datum.wow_pct != None)
-        )
-        return (bars + zero + labels).properties(
-            title="",
-            width=700,
-            height=250,
-        )
-
-    with tab3:  
-        try:
-            profit_data = profit_summary[profit_summary["route"] == route]
-            weekly = prepare_weekly_profit(profit_summary, profit_route, time_col) 
-            if weekly.empty:
-                st.info("No data to show WoW.")
+    with tab3:
+        if not cube.has_profit:
+            st.warning("⚠️ 当前未上传利润数据文件。")
+        else:
+            compare = st.radio("Compare with", ["Previous period", "Same period last year"], horizontal=True)
+            field = "pop_pct" if compare == "Previous period" else "yoy_pct"
+            pop_summary = cube.pop_summary[time_col]
+            if profit_route == "ALL":
+                # Every route's changes at once, precomputed with the cube.
+                chart_key = ("pop", time_col, field)
+                if chart_key not in cube.charts:
+                    cube.charts[chart_key] = pop_heatmap(pop_summary, time_col, field).to_dict()
+                st.vega_lite_chart(cube.charts[chart_key], use_container_width=True)
             else:
-                wow_df = compute_wow(weekly, time_col)
-                st.altair_chart(make_wow_chart(wow_df, time_col), use_container_width=True)
-        except Exception as e:
-            st.warning("⚠️ 当前未上传利润数据文件。")
\ No newline at end of file
+                route_pop = pop_summary[pop_summary["route"] == profit_route]
+                if route_pop[field].isna().all():
+                    st.info("No data to show WoW.")
+                else:
+                    st.altair_chart(make_wow_chart(route_pop, time_col, field), use_container_width=True)
+
+if profiler is not None:
+    with st.sidebar.expander("🩺 Stage timings", expanded=True):
+        if (uploaded_files or use_history) and cube.stages:
+            st.caption("Cube build (peak_mb: resident memory growth; ingest.* summed over parse jobs)")
+            st.dataframe(pd.DataFrame(cube.stages), hide_index=True)
+        st.caption(f"Shared datasets: {get_datasets().stats()}")
+        st.caption("This rerun")
+        st.dataframe(pd.DataFrame(profiler.records()), hide_index=True)
+
+if job is not None:
+    # Redraw with the next partial cube until the background build is done.
+    time.sleep(POLL_SECONDS)
+    st.rerun()
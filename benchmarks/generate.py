@@ -0,0 +1,163 @@
+"""Synthetic route and rail workbooks shaped like the real exports.
+
+Route workbooks hold one year each, one sheet per route, with the columns
+the app reads (ETD, Chrgb CBM, Containerno, MMSCN) mixed in with columns it
+ignores. Shipments are grouped onto departures and consolidated into
+containers the way LCL cargo is. The rail workbook carries the SHAE key and
+eight "Formula" columns, so the profit lands in "Formula.7".
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Bump when the generated layout changes so cached workbooks are rebuilt.
+GENERATOR_VERSION = 1
+
+ROUTES = [
+    "XIAN-HAM", "XIAN-DUI", "CHONGQING-DUI", "CHENGDU-LODZ", "WUHAN-LODZ", "ZHENGZHOU-HAM",
+    "YIWU-MAD", "SUZHOU-WAW", "HEFEI-BUD", "CHANGSHA-MIL", "SHENYANG-DUI", "XIAMEN-BUD",
+]
+YEARS = [2024, 2025]
+ROUTE_HEADER = ["No", "ETD", "WEEKNUM", "Shipper", "Chrgb CBM", "Containerno", "MMSCN", "Remark"]
+RAIL_HEADER = ["Date", "Route", "Customer", "Type", "SHAE"] + ["Formula"] * 8
+# Excel stores dates as days since 1899-12-30.
+EXCEL_EPOCH = np.datetime64("1899-12-30")
+SHIPMENTS_PER_CONTAINER = 12
+DEPARTURES_PER_WEEK = 3
+RAIL_SHARE = 0.4
+
+SCALES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_scale(text):
+    """'10k' -> 10000, '2.5m' -> 2500000."""
+    text = str(text).strip().lower()
+    if text[-1:] in SCALES:
+        return int(float(text[:-1]) * SCALES[text[-1]])
+    return int(text)
+
+
+def format_scale(rows):
+    for suffix, size in sorted(SCALES.items(), key=lambda item: -item[1]):
+        if rows >= size and rows % size == 0:
+            return f"{rows // size}{suffix}"
+    return str(rows)
+
+
+def _route_sizes(rows, n_routes, rng):
+    # A few busy corridors and a long tail, like the real network.
+    weights = 1 / np.arange(1, n_routes + 1) ** 0.8
+    sizes = rng.multinomial(rows, weights / weights.sum())
+    return sizes
+
+
+def route_frame(route_id, year, rows, rng):
+    """Shipments for one route sheet as columns of ROUTE_HEADER."""
+    days = pd.date_range(f"{year}-01-01", f"{year}-12-31").to_numpy()
+    departures = np.sort(rng.choice(days, size=min(len(days), 52 * DEPARTURES_PER_WEEK), replace=False))
+    departure = np.sort(rng.integers(0, len(departures), rows))
+    etd = departures[departure]
+
+    # Shipments on a departure are consolidated into its containers in order.
+    per_departure = np.bincount(departure, minlength=len(departures))
+    starts = np.repeat(np.cumsum(per_departure) - per_departure, per_departure)
+    slot = (np.arange(rows) - starts) // SHIPMENTS_PER_CONTAINER
+    container_ids = rng.integers(0, 10_000_000, len(departures))
+    containers = np.char.add("TGHU", ((container_ids[departure] + slot) % 10_000_000).astype(str))
+
+    cbm = np.round(rng.lognormal(1.2, 0.9, rows).clip(0.1, 60), 2)
+    serial = (etd - EXCEL_EPOCH).astype("timedelta64[D]").astype(np.int64).astype(object)
+    # A few shipments are booked without a departure date yet.
+    serial[rng.random(rows) < 0.002] = None
+    mmscn = np.char.add(f"SH{year % 100:02d}{route_id:02d}", np.arange(rows).astype(str))
+    return {
+        "No": np.arange(1, rows + 1),
+        "ETD": serial,
+        "WEEKNUM": pd.DatetimeIndex(etd).isocalendar().week.to_numpy(),
+        "Shipper": rng.choice(["ACME", "GLOBAL TRADE", "EURASIA", "NORTHWIND"], rows),
+        "Chrgb CBM": cbm,
+        "Containerno": containers,
+        "MMSCN": mmscn,
+        "Remark": np.where(rng.random(rows) < 0.05, "urgent", ""),
+    }
+
+
+def _write_rows(worksheet, header, columns, formats):
+    worksheet.write_row(0, 0, header)
+    for col, name in enumerate(columns):
+        if name in formats:
+            worksheet.set_column(col, col, 12, formats[name])
+    # Plain Python values: xlsxwriter dispatches on type per cell.
+    values = [column.tolist() for column in columns.values()]
+    write_row = worksheet.write_row
+    for i, row in enumerate(zip(*values), start=1):
+        write_row(i, 0, row)
+
+
+def write_route_workbook(path, year, sizes, seed):
+    import xlsxwriter
+
+    rng = np.random.default_rng([seed, year])
+    workbook = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+    for route_id, (route, rows) in enumerate(zip(ROUTES, sizes)):
+        if rows:
+            worksheet = workbook.add_worksheet(route)
+            _write_rows(worksheet, ROUTE_HEADER, route_frame(route_id, year, rows, rng), {"ETD": date_format})
+    # Real exports carry a notes sheet with no shipment rows.
+    workbook.add_worksheet("Notes").write(0, 0, "Generated for benchmarks")
+    workbook.close()
+
+
+def write_rail_workbook(path, route_sizes, seed):
+    import xlsxwriter
+
+    rng = np.random.default_rng([seed, 0])
+    keys = []
+    for year, sizes in zip(YEARS, route_sizes):
+        for route_id, rows in enumerate(sizes):
+            picked = np.flatnonzero(rng.random(rows) < RAIL_SHARE)
+            keys.append(np.char.add(f"SH{year % 100:02d}{route_id:02d}", picked.astype(str)))
+    keys = np.concatenate(keys) if keys else np.array([], dtype=str)
+    # Some MMSCNs are billed on more than one rail row.
+    keys = np.concatenate([keys, rng.choice(keys, len(keys) // 50)]) if len(keys) else keys
+    n = len(keys)
+    columns = {
+        "Date": np.full(n, "2025-01-01"),
+        "Route": np.full(n, "RAIL"),
+        "Customer": rng.choice(["A", "B", "C"], n),
+        "Type": np.full(n, "LCL"),
+        "SHAE": keys,
+    }
+    for i in range(8):
+        columns[f"Formula{i}"] = np.round(rng.normal(80, 250, n), 2)
+    workbook = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+    _write_rows(workbook.add_worksheet("Sheet1"), RAIL_HEADER, columns, {})
+    workbook.close()
+
+
+def generate(out_dir, rows, seed=0, routes=len(ROUTES)):
+    """Write ``rows`` shipments (split over YEARS x routes) plus a rail file.
+
+    Returns the workbook paths; existing files for the same scale and seed
+    are reused.
+    """
+    out_dir = Path(out_dir) / f"{format_scale(rows)}-r{routes}-s{seed}-v{GENERATOR_VERSION}"
+    rail_path = out_dir / "Rail_profit.xlsx"
+    paths = [out_dir / f"routes_{year}.xlsx" for year in YEARS] + [rail_path]
+    if all(p.exists() for p in paths):
+        return paths
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    per_year = rng.multinomial(rows, [1 / len(YEARS)] * len(YEARS))
+    route_sizes = [_route_sizes(n, routes, rng) for n in per_year]
+    for year, sizes, path in zip(YEARS, route_sizes, paths):
+        tmp = path.with_suffix(".tmp")
+        write_route_workbook(tmp, year, sizes, seed)
+        os.replace(tmp, path)
+    tmp = rail_path.with_suffix(".tmp")
+    write_rail_workbook(tmp, route_sizes, seed)
+    os.replace(tmp, rail_path)
+    return paths
@@ -0,0 +1,210 @@
+"""Scaling benchmark for the report pipeline.
+
+    python -m benchmarks --scales 10k 100k 1m
+    python -m benchmarks --scales 10k 100k --check        # exit 1 on regressions
+    python -m benchmarks --scales 10k 100k 1m --save-baseline
+
+Workbooks come from ``benchmarks.generate`` and are written once per scale
+under the cache directory. Every stage runs in this process on one core, so
+the numbers measure per-row cost rather than the worker pool. Wall times are
+the best of ``--repeat`` untraced runs; peak memory comes from one extra run
+under tracemalloc. Nothing touches the network.
+
+The committed baseline is recorded with the openpyxl engine that
+requirements.txt installs (LCL_XLSX_ENGINE=openpyxl). A run with another
+engine or generator version is not compared against it.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.generate import GENERATOR_VERSION, format_scale, generate, parse_scale
+from lcl.cache import DEFAULT_CACHE_DIR
+from lcl.charts import AXIS_RANGES, all_routes_chart
+from lcl.cube import TIME_COLS, build_cube
+from lcl.ingest import combine_route_sheets, is_rail_file, parse_rail, parse_route_sheet
+from lcl.join import join_shipments
+from lcl.normalize import normalize_shipments
+from lcl.profiling import Profiler
+from lcl.reader import ENGINES, PREFERRED_ENGINES, ROUTE_COLUMNS, iter_sheets
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+DEFAULT_SCALES = ["10k", "100k", "1m"]
+# Slower or bigger than baseline by more than this fraction is a regression...
+DEFAULT_TOLERANCE = 0.25
+# ...unless the difference is within timer and allocator noise.
+NOISE_MS = 25
+NOISE_MB = 2
+# Baselines from another engine or generator measure different work and are not compared.
+COMPARABLE = ["engine", "generator"]
+
+
+def run_pipeline(workbooks, profiler):
+    """Run each pipeline stage on ``workbooks`` [(name, bytes)] under ``profiler``."""
+    with profiler.stage("parse", rows_in=len(workbooks)) as stage:
+        files = []
+        loss_dfs = []
+        for name, data in workbooks:
+            if is_rail_file(name):
+                loss_dfs.append(parse_rail(data))
+            else:
+                files.append(list(iter_sheets(data, ROUTE_COLUMNS)))
+        stage.rows_out = sum(len(df) for sheets in files for _, df in sheets) + sum(len(df) for df in loss_dfs)
+
+    with profiler.stage("bucket", rows_in=stage.rows_out - sum(len(df) for df in loss_dfs)) as stage:
+        parts = []
+        for sheets in files:
+            parsed = [parse_route_sheet(name, df) for name, df in sheets]
+            parts.append([df for df in parsed if df is not None])
+        stage.rows_out = sum(len(df) for dfs in parts for df in dfs)
+
+    with profiler.stage("normalize", rows_in=stage.rows_out) as stage:
+        # As in the parse workers: compact each sheet, then union the categories.
+        dfs = [df for df in (combine_route_sheets([normalize_shipments(d) for d in p]) for p in parts) if not df.empty]
+        stage.rows_out = sum(len(df) for df in dfs)
+
+    with profiler.stage("join", rows_in=stage.rows_out + sum(len(df) for df in loss_dfs)) as stage:
+        df, _ = join_shipments(dfs, loss_dfs)
+        stage.rows_out = len(df)
+
+    with profiler.stage("cube", rows_in=len(df)) as stage:
+        cube = build_cube(df)
+        stage.rows_out = sum(len(frame) for frame in cube.summary.values())
+
+    with profiler.stage("cube_approx", rows_in=len(df)) as stage:
+        stage.rows_out = sum(len(frame) for frame in build_cube(df, approx_distinct=True).summary.values())
+
+    with profiler.stage("chart_spec", rows_in=sum(len(frame) for frame in cube.summary.values())) as stage:
+        specs = [all_routes_chart(cube.summary[col], col, *AXIS_RANGES[col]).to_dict() for col in TIME_COLS]
+        stage.rows_out = len(specs)
+
+
+def bench_scale(rows, data_dir, repeat=3, memory=True):
+    """Return {stage: record} for one scale."""
+    paths = generate(data_dir, rows)
+    workbooks = [(p.name, p.read_bytes()) for p in paths]
+    results = {}
+    for _ in range(repeat):
+        profiler = Profiler(source="bench", scale=format_scale(rows))
+        run_pipeline(workbooks, profiler)
+        for record in profiler.records():
+            best = results.get(record["stage"])
+            if best is None or record["wall_ms"] < best["wall_ms"]:
+                results[record["stage"]] = record
+    if memory:
+        profiler = Profiler(trace_memory=True, source="bench", scale=format_scale(rows))
+        run_pipeline(workbooks, profiler)
+        for record in profiler.records():
+            results[record["stage"]]["peak_mb"] = record["peak_mb"]
+
+    for record in results.values():
+        record.pop("stage")
+        # Parse takes files and yields rows, the other stages take rows.
+        rows = max(record["rows_in"] or 0, record["rows_out"] or 0)
+        record["rows_per_s"] = round(rows / (record["wall_ms"] / 1000)) if record["wall_ms"] else None
+    return results
+
+
+def environment():
+    engine = os.environ.get("LCL_XLSX_ENGINE") or next(name for name in PREFERRED_ENGINES if name in ENGINES)
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "engine": engine,
+        "generator": GENERATOR_VERSION,
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Annotate ``results`` with ratios to ``baseline``; return the regressions."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, record in stages.items():
+            base = baseline.get(scale, {}).get(stage)
+            if base is None:
+                continue
+            for field, noise in (("wall_ms", NOISE_MS), ("peak_mb", NOISE_MB)):
+                now, then = record.get(field), base.get(field)
+                if now is None or then is None:
+                    continue
+                record[f"{field}_ratio"] = round(now / then, 2) if then else None
+                if now > then * (1 + tolerance) and now - then > noise:
+                    regressions.append(f"{scale} {stage} {field}: {then} -> {now}")
+    return regressions
+
+
+def format_table(results):
+    rows = []
+    for scale, stages in results.items():
+        for stage, record in stages.items():
+            rows.append({"scale": scale, "stage": stage, **record})
+    return pd.DataFrame(rows).to_string(index=False)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time the report pipeline at several scales.")
+    parser.add_argument("--scales", nargs="+", default=DEFAULT_SCALES, help="shipment rows per run, e.g. 10k 2.5m")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scale; the fastest is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--data-dir", default=DEFAULT_CACHE_DIR / "bench", type=Path,
+                        help="where generated workbooks are kept between runs")
+    parser.add_argument("--baseline", default=BASELINE_PATH, type=Path)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when a stage regressed")
+    parser.add_argument("--out", type=Path, help="also write the results as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = {}
+    for scale in args.scales:
+        rows = parse_scale(scale)
+        print(f"{format_scale(rows)}: running...", file=sys.stderr)
+        results[format_scale(rows)] = bench_scale(rows, args.data_dir, args.repeat, not args.no_memory)
+
+    regressions = []
+    baseline = None
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        recorded = baseline["environment"]
+        then = {k: recorded.get(k) for k in COMPARABLE}
+        now = {k: environment()[k] for k in COMPARABLE}
+        if then != now:
+            print(f"Baseline was recorded with {then}, this run uses {now}; not comparing. "
+                  "Record a baseline for this setup with --save-baseline.", file=sys.stderr)
+            baseline = None
+        else:
+            if recorded != environment():
+                print(f"Baseline was recorded on {recorded}, this run is {environment()}", file=sys.stderr)
+            regressions = compare(results, baseline["results"], args.tolerance)
+    print(format_table(results))
+
+    report = {"environment": environment(), "results": results}
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        # Scales not rerun keep their stored numbers.
+        merged = dict(baseline["results"]) if baseline else {}
+        merged.update({scale: {stage: {k: v for k, v in record.items() if not k.endswith("_ratio")}
+                               for stage, record in stages.items()}
+                       for scale, stages in results.items()})
+        args.baseline.write_text(json.dumps({"environment": environment(), "results": merged}, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print("Regressions against the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        if args.check:
+            return 1
+    elif baseline is not None:
+        print("No regressions against the baseline.")
+    return 0
@@ -0,0 +1,130 @@
+"""Report builds that run on a background thread and outlive Streamlit reruns."""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from lcl.ingest import iter_uploads
+from lcl.join import DEFAULT_PROFIT_POLICY
+from lcl.profiling import maybe_stage
+from lcl.report import add_parse_stages, cube_from_frames
+
+# Finished jobs kept for sessions (or a browser refresh) that have not
+# collected them yet.
+KEEP_FINISHED = 4
+# Partial cubes are rebuilt from everything parsed so far, so publishing one
+# after every file would be quadratic in the upload count. The first route
+# workbook is published at once; later ones wait at least PARTIAL_SECONDS,
+# and at least PARTIAL_FACTOR times the previous partial build's duration.
+PARTIAL_SECONDS = 2.0
+PARTIAL_FACTOR = 4
+
+
+class FileProgress:
+    def __init__(self, name):
+        self.name = name
+        self.status = "queued"
+        self.sheets = []
+
+
+class IngestJob:
+    """Parse, join and aggregate uploads on a daemon thread.
+
+    ``cube`` is the latest cube, built from the files finished so far (None
+    until the first route workbook is parsed, then refreshed every few
+    seconds at most; see PARTIAL_SECONDS); it is the final report once
+    ``done`` is set and ``error`` is None. ``files`` holds a FileProgress per
+    upload, in upload order.
+    """
+
+    def __init__(self, files, profit_policy=DEFAULT_PROFIT_POLICY, approx_distinct=False, cache=None,
+                 workers=None, profiler=None):
+        self.files = [FileProgress(f.name) for f in files]
+        self.profit_policy = profit_policy
+        self.approx_distinct = approx_distinct
+        self.cube = None
+        self.done = False
+        self.error = None
+        self.started = time.monotonic()
+        self.finished = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, args=(files, cache, workers, profiler), name="lcl-ingest", daemon=True)
+        self._thread.start()
+
+    @property
+    def files_done(self):
+        return sum(f.status == "done" for f in self.files)
+
+    def _on_sheet(self, i, sheet_name):
+        with self._lock:
+            self.files[i].status = "parsing"
+            self.files[i].sheets.append(sheet_name)
+
+    def _build(self, frames, profiler=None):
+        dfs = []
+        loss_dfs = []
+        for i in sorted(frames):
+            kind, df = frames[i]
+            if kind == "rail":
+                loss_dfs.append(df)
+            elif not df.empty:
+                dfs.append(df)
+        return cube_from_frames(dfs, loss_dfs, self.profit_policy, self.approx_distinct, profiler)
+
+    def _run(self, files, cache, workers, profiler):
+        try:
+            frames = {}
+            timings = Counter()
+            next_partial = 0.0
+            with maybe_stage(profiler, "ingest", rows_in=len(files)) as stage:
+                hits = (cache.hits + cache.disk_hits) if cache is not None else 0
+                for i, kind, df in iter_uploads(files, cache, workers, self._on_sheet, timings):
+                    frames[i] = (kind, df)
+                    with self._lock:
+                        self.files[i].status = "done"
+                    # Publish the routes parsed so far; a rail file alone adds no chart.
+                    if (kind == "route" and not df.empty and len(frames) < len(files)
+                            and time.monotonic() >= next_partial):
+                        start = time.monotonic()
+                        self.cube = self._build(frames)
+                        now = time.monotonic()
+                        next_partial = now + max(PARTIAL_SECONDS, PARTIAL_FACTOR * (now - start))
+                stage.rows_out = sum(len(df) for _, df in frames.values())
+                if cache is not None:
+                    stage.detail["cached_files"] = cache.hits + cache.disk_hits - hits
+            add_parse_stages(profiler, timings)
+            cube = self._build(frames, profiler)
+            if profiler is not None:
+                cube.stages = profiler.records()
+            self.cube = cube
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = time.monotonic()
+            self.done = True
+
+
+class JobRegistry:
+    """Process-wide IngestJobs by key, so a rerun or refresh rejoins a running build."""
+
+    def __init__(self, keep_finished=KEEP_FINISHED):
+        self.keep_finished = keep_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_start(self, key, *args, **kwargs):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.error is not None:
+                job = self._jobs[key] = IngestJob(*args, **kwargs)
+            self._jobs.move_to_end(key)
+            finished = [k for k, j in self._jobs.items() if j.done and k != key]
+            for k in finished[:max(len(finished) - self.keep_finished, 0)]:
+                del self._jobs[k]
+            return job
+
+    def discard(self, key, job):
+        """Forget ``job`` once its cube has been collected elsewhere."""
+        with self._lock:
+            if self._jobs.get(key) is job:
+                del self._jobs[key]
@@ -0,0 +1,77 @@
+"""Calendar bucketing on datetime64 arithmetic.
+
+Shipment frames carry integer period keys that include the year
+(weeknum 202405, month 202401, quarter 20241); summary frames carry the
+string labels ("2024-W05", "2024-01", "2024Q1"), which sort chronologically.
+"""
+import numpy as np
+import pandas as pd
+
+
+def bucket_keys(etd):
+    """Return (week, month, quarter) int32 keys for a datetime Series without NaT.
+
+    Weeks follow strftime("%U") + 1: week 1 runs up to the year's first
+    Saturday and every later week starts on a Sunday.
+    """
+    days = etd.to_numpy(dtype="datetime64[D]")
+    years = days.astype("datetime64[Y]")
+    year = years.astype(np.int64) + 1970
+    month = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    yday = (days - years.astype("datetime64[D]")).astype(np.int64)
+    # 1970-01-01 was a Thursday; wday counts days since Sunday.
+    wday = (days.astype(np.int64) + 4) % 7
+    week = (yday + 7 - wday) // 7 + 1
+    quarter = (month - 1) // 3 + 1
+    return (
+        (year * 100 + week).astype(np.int32),
+        (year * 100 + month).astype(np.int32),
+        (year * 10 + quarter).astype(np.int32),
+    )
+
+
+def add_buckets(df):
+    df = df[df["ETD"].notna()]
+    week, month, quarter = bucket_keys(df["ETD"])
+    return df.assign(weeknum=week, month=month, quarter=quarter)
+
+
+# Key distance between the same period in consecutive years.
+YEAR_STEP = {"weeknum": 100, "month": 100, "quarter": 10}
+
+
+def period_ordinal(time_col, keys):
+    """Number period keys consecutively across years: the previous period is ordinal - 1."""
+    keys = np.asarray(keys, dtype=np.int64)
+    year, period = np.divmod(keys, YEAR_STEP[time_col])
+    if time_col == "month":
+        return year * 12 + period - 1
+    if time_col == "quarter":
+        return year * 4 + period - 1
+    if not len(keys):
+        return keys
+    # A year's weeks run from the week of Jan 1 (week 2 when it is a
+    # Sunday) to the week of Dec 31.
+    years = np.arange(year.min(), year.max() + 1)
+    jan1 = (years - 1970).astype("datetime64[Y]").astype("datetime64[D]")
+    dec31 = (years - 1969).astype("datetime64[Y]").astype("datetime64[D]") - np.timedelta64(1, "D")
+    first = bucket_keys(pd.Series(jan1))[0].astype(np.int64) % 100
+    last = bucket_keys(pd.Series(dec31))[0].astype(np.int64) % 100
+    offsets = np.concatenate([[0], np.cumsum(last - first + 1)[:-1]])
+    i = year - years[0]
+    return offsets[i] + period - first[i]
+
+
+LABELS = {
+    "weeknum": lambda key: f"{key // 100}-W{key % 100:02d}",
+    "month": lambda key: f"{key // 100}-{key % 100:02d}",
+    "quarter": lambda key: f"{key // 10}Q{key % 10}",
+}
+
+
+def label_buckets(time_col, keys):
+    """Map a Series of period keys to labels, formatting each distinct key once."""
+    codes, uniques = pd.factorize(keys)
+    fmt = LABELS[time_col]
+    labels = np.array([fmt(int(key)) for key in uniques], dtype=object)
+    return pd.Series(labels[codes], index=keys.index, name=keys.name)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+# Bump when the parsing logic changes so stale on-disk frames are ignored.
+PARSER_VERSION = 5
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("LCL_CACHE_DIR", Path.home() / ".cache" / "lcl_report"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+class IngestCache:
+    """Parsed-frame cache keyed on workbook content.
+
+    Frames live in an in-memory LRU bounded by ``max_bytes`` and are backed
+    by Parquet files in ``cache_dir``, so a restart only re-reads Parquet.
+    The directory is kept under ``max_disk_bytes`` by deleting the least
+    recently used files (by mtime, which a read refreshes), and files from
+    another PARSER_VERSION are deleted outright. Cached frames are shared
+    between reruns and must be treated as read-only.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_lock = threading.Lock()
+        self.prune_disk()
+
+    def key(self, kind, data):
+        return f"{kind}-v{PARSER_VERSION}-{content_hash(data)}"
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.parquet"
+
+    def _remember(self, key, df):
+        size = frame_nbytes(df)
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return
+            self._frames[key] = df
+            self._sizes[key] = size
+            self._total += size
+            while self._total > self.max_bytes and len(self._frames) > 1:
+                old, _ = self._frames.popitem(last=False)
+                self._total -= self._sizes.pop(old)
+
+    def _lookup(self, key):
+        with self._lock:
+            df = self._frames.get(key)
+            if df is not None:
+                self._frames.move_to_end(key)
+            return df
+
+    def _read_disk(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except Exception:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Pruned by another process meanwhile; the frame is still good.
+            pass
+        return df
+
+    def _write_disk(self, key, df):
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        except Exception:
+            # Mixed-type object columns can't always be stored as Parquet;
+            # the frame stays in memory only.
+            tmp.unlink(missing_ok=True)
+            return
+        self.prune_disk()
+
+    def prune_disk(self):
+        """Delete stale-version files, then the oldest files until under max_disk_bytes."""
+        if self.cache_dir is None or not self.cache_dir.is_dir():
+            return
+        version = f"-v{PARSER_VERSION}-"
+        with self._disk_lock:
+            files = []
+            for path in self.cache_dir.glob("*.parquet"):
+                try:
+                    if version not in path.name:
+                        path.unlink()
+                    else:
+                        stat = path.stat()
+                        files.append((stat.st_mtime, stat.st_size, path))
+                except FileNotFoundError:
+                    # Another process pruned it first.
+                    continue
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            # The newest file is kept even when it alone exceeds the cap.
+            for _, size, path in files[:-1]:
+                if total <= self.max_disk_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def get(self, key):
+        df = self._lookup(key)
+        if df is not None:
+            self.hits += 1
+            return df
+        df = self._read_disk(key)
+        if df is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, df)
+        return df
+
+    def put(self, key, df):
+        self._write_disk(key, df)
+        self._remember(key, df)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._sizes.clear()
+            self._total = 0
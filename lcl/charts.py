@@ -0,0 +1,302 @@
+import altair as alt
+import pandas as pd
+
+# Fixed y-axis tops per granularity: (TEU, CBM).
+AXIS_RANGES = {
+    "weeknum": (20, 500),
+    "month": (50, 1000),
+    "quarter": (100, 3000),
+}
+
+
+def _header(prefix):
+    return alt.Header(
+        title=None, labelExpr=f"'{prefix} - ' + datum.value", labelOrient="top", labelAnchor="start",
+        labelFontSize=20, labelFontWeight="bold", labelPadding=10)
+
+
+def _total_text(op, field, template):
+    return alt.Chart().transform_aggregate(
+        total=f"{op}({field})"
+    ).transform_calculate(
+        label=template.replace("{}", "' + format(datum.total, '.0f') + '")
+    ).mark_text(
+        color="#CA001D", fontSize=20, fontWeight="bold", align="center", dy=-30
+    ).encode(x=alt.value(0), y=alt.value(0), text="label:N")
+
+
+def all_routes_chart(summary, time_col, teu_range, cbm_range):
+    """TEU / CBM / LD rows faceted by route over one shared dataset.
+
+    Every layer reads the same frame, so the spec carries a single copy of
+    the data no matter how many routes are shown; per-route totals are
+    computed by Vega transforms instead of one-row helper frames.
+    """
+    data = summary[["route", time_col, "TEU", "Chrgb CBM", "AVG L/D"]]
+    x = alt.X(f"{time_col}:O", title="")
+    size = {"width": 200, "height": 300}
+
+    teu = alt.layer(
+        alt.Chart().mark_bar(color="#498684").encode(
+            x=x, y=alt.Y("TEU:Q", title="", scale=alt.Scale(domain=[0, teu_range])),
+            tooltip=[time_col, "TEU"]).properties(**size),
+        _total_text("sum", "TEU", "'TTL {} TEU'"),
+        data=data,
+    ).facet(column=alt.Column("route:N", header=_header("Vol(TEU)")))
+
+    cbm = alt.layer(
+        alt.Chart().mark_bar(color="#498684").encode(
+            x=x, y=alt.Y("Chrgb CBM:Q", title="", scale=alt.Scale(domain=[0, cbm_range])),
+            tooltip=[time_col, "Chrgb CBM"]).properties(**size),
+        _total_text("sum", "Chrgb CBM", "'TTL {} CBM'"),
+        data=data,
+    ).facet(column=alt.Column("route:N", header=_header("Vol(C.CBM)")))
+
+    ld_y = alt.Y("AVG L/D:Q", title="", scale=alt.Scale(domain=[0, 100]))
+    ld = alt.layer(
+        alt.Chart().mark_line(color="#498684").encode(
+            x=x, y=ld_y, tooltip=[time_col, "AVG L/D"]).properties(**size),
+        alt.Chart().mark_point(color="#498684", filled=True, size=80).encode(
+            x=x, y=ld_y, tooltip=[time_col, "AVG L/D"]),
+        alt.Chart().mark_rule(color="#E4BDC2", strokeWidth=2).encode(
+            y="avg:Q").transform_aggregate(avg="mean(AVG L/D)"),
+        _total_text("mean", "AVG L/D", "'AVG {} %'"),
+        data=data,
+    ).facet(column=alt.Column("route:N", header=_header("LD(%)")))
+
+    return alt.vconcat(
+        teu.resolve_scale(x="independent"),
+        cbm.resolve_scale(x="independent"),
+        ld.resolve_scale(x="independent"),
+    ).resolve_scale(y="independent")
+
+
+def route_chart(data, route, time_col, teu_range, cbm_range):
+    """TEU / CBM / LD charts for a single route."""
+#-----------TEU##################################################################################################################################
+    teu_chart = alt.Chart(data).mark_bar(color = "#498684").encode(
+        x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("TEU:Q", title="", scale=alt.Scale(domain=[0, teu_range])),
+        tooltip=[time_col, "TEU"]
+        ).properties(
+        title=alt.TitleParams(text="Vol(TEU)", fontSize=20, fontWeight="bold", anchor="start", offset=10),
+        width=600,
+        height=300
+        )
+    total_teu = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
+            text=f"TTL {data['TEU'].sum():.0f} TEU",
+            color="#CA001D", fontSize=20, fontWeight="bold", align="center", dy=-30).encode(x=alt.value(0), y=alt.value(0))
+    teu_text = alt.Chart(data).mark_text(
+        color = "#498684",
+        align="center",
+        baseline="bottom",
+        dy=-5,
+        fontSize=12).encode(
+        x=f"{time_col}:O",
+        y="TEU:Q",
+        text=alt.Text("TEU:Q"))
+#-------CBM##################################################################################################################################
+    cbm_chart = alt.Chart(data).mark_bar(color = "#498684").encode(
+        x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("Chrgb CBM:Q", title="", scale=alt.Scale(domain=[0, cbm_range])),
+        tooltip=[time_col, "Chrgb CBM"]
+        ).properties(
+        title=alt.TitleParams(text="Vol(C.CBM)", fontSize=20, fontWeight="bold", anchor="start", offset=10),
+        width=600,
+        height=300
+        )
+    total_cbm = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
+        text=f"TTL {data['Chrgb CBM'].sum():.0f} CBM",
+        color="#CA001D",
+        fontSize=20,
+        fontWeight="bold",
+        align="center",
+        dy=-30  # 上移
+    ).encode(
+        x=alt.value(0),
+        y=alt.value(0))
+    cbm_text = alt.Chart(data).mark_text(
+        color = "#498684",
+        align="center",
+        baseline="bottom",
+        dy=-5,
+        fontSize=12).encode(
+        x=f"{time_col}:O",
+        y="Chrgb CBM:Q",
+        text=alt.Text("Chrgb CBM:Q", format=".1f"))
+#-------AVG L/D##################################################################################################################################
+    avg_ld = data["AVG L/D"].mean()
+    ld_chart = alt.Chart(data).mark_line(color = "#498684").encode(
+        x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("AVG L/D:Q", title="", scale=alt.Scale(domain=[0, 100])),
+        tooltip=[time_col, "AVG L/D"]).properties(
+        title=alt.TitleParams(text="LD(%)", fontSize=20,fontWeight="bold",anchor="start",offset=10),
+        width=600,
+        height=300)
+    ld_points = alt.Chart(data).mark_point(color="#498684", filled=True, size=80).encode(
+        x=f"{time_col}:O",
+        y="AVG L/D:Q",
+        tooltip=[time_col, "AVG L/D"])
+    avg_line = alt.Chart(pd.DataFrame({"y": [avg_ld]})).mark_rule(
+        color="#E4BDC2", strokeWidth=2).encode(y="y:Q")
+    avg_text = alt.Chart(pd.DataFrame({"x": [0], "y": [0]})).mark_text(
+        text=f"AVG {avg_ld:.0f} %",
+        color="#CA001D",
+        fontSize=20,
+        fontWeight="bold",
+        align="center",
+        dy=-30  # 上移
+    ).encode(
+        x=alt.value(0),
+        y=alt.value(0))
+##################################################################################################################################
+    return alt.vconcat(
+        teu_chart + total_teu + teu_text,
+        cbm_chart + cbm_text + total_cbm,
+        ld_chart + ld_points + avg_line + avg_text).resolve_scale(
+            y='independent').properties(
+            title=f"{route}").configure_title(
+            fontSize=20,
+            color="#498684",
+            anchor='start')
+
+
+def make_profit_chart(df, title, time_col):
+    base = alt.Chart(df).encode(x=alt.X(f"{time_col}:O", title="", axis=alt.Axis(labelAngle=0)))
+
+    bars = base.mark_bar().encode(
+        y=alt.Y("Shared_Profit:Q", axis=alt.Axis(title="USD", titleAngle=0, titleFontSize=14,titleAnchor="start",titleY=-5)),
+        color=alt.Color("color:N", scale=None, legend=None),
+        tooltip=["route", time_col, "Shared_Profit"],
+    )
+
+    pos_text = (
+        base.mark_text(
+            dy=-5,
+            align="center",
+            baseline="bottom",
+            fontSize=12,
+            color="#498684",
+        )
+        .encode(
+            y=alt.Y("Shared_Profit:Q"),
+            text=alt.Text("Shared_Profit:Q", format=".0f"),
+        )
+        .transform_filter(alt.datum.Shared_Profit >= 0)
+    )
+
+    neg_text = (
+        base.mark_text(
+            dy=5,
+            align="center",
+            baseline="top",
+            fontSize=12,
+            color="#CA001D",
+        )
+        .encode(
+            y=alt.Y("Shared_Profit:Q"),
+            text=alt.Text("Shared_Profit:Q", format=".0f"),
+        )
+        .transform_filter(alt.datum.Shared_Profit < 0)
+    )
+
+    layered = alt.layer(bars, pos_text, neg_text).properties(
+        width=600,
+        height=150,
+        title=alt.TitleParams(
+            text=title, fontSize=20, color="#498684", anchor="start", offset=10
+        ),
+    ).resolve_scale(y="shared")
+    return layered
+
+
+def all_profit_chart(profit_summary, routes, time_col):
+    """Profit charts for every route with non-zero profit, or None."""
+    charts = []
+    for route in routes:
+        profit_data = profit_summary[profit_summary["route"] == route]
+        if profit_data.empty:
+            continue
+        if profit_data["Shared_Profit"].dropna().abs().max() == 0:
+            continue
+        charts.append(make_profit_chart(profit_data, route, time_col))
+    if not charts:
+        return None
+    return alt.vconcat(*charts).resolve_scale(y="independent")
+
+
+def change_label(time_col, field="pop_pct"):
+    if field == "yoy_pct":
+        return "Year-over-Year"
+    return {
+        "weeknum": "Week-over-Week",
+        "month": "Month-over-Month",
+        "quarter": "Quarter-over-Quarter"
+        }.get(time_col, "Period-over-Period")
+
+
+def make_wow_chart(weekly, time_col, field="pop_pct"):
+    """Bars of one route's ``field`` change from a ``lcl.pop.period_changes`` frame."""
+    time_label = change_label(time_col, field)
+    base = alt.Chart(weekly)
+    bars = base.mark_bar().encode(
+        x=alt.X(f"{time_col}:O", title=time_label, axis=alt.Axis(labelAngle=0)),
+        y=alt.Y(f"{field}:Q", title=f"{time_label} % Change", axis=alt.Axis(format=".0%")),
+        color=alt.condition(
+            alt.datum[field] >= 0,
+            alt.value("#2ca02c"),
+            alt.value("#d62728"),
+        ),
+        tooltip=[
+            alt.Tooltip(f"{time_col}:O", title=""),
+            alt.Tooltip("Shared_Profit:Q", title="Profit", format=","),
+            alt.Tooltip(f"{field}:Q", title="Change", format=".1%")
+        ],
+    )
+    zero = alt.Chart(pd.DataFrame({"y": [0]})).mark_rule(strokeDash=[4,4], color="gray").encode(
+        y=alt.Y("y:Q")
+    )
+    labels = (
+        base.mark_text(dy=-5, align="center", baseline="bottom", fontSize=11)
+        .encode(
+            x=alt.X(f"{time_col}:O", sort=alt.EncodingSortField(field = time_col, order="ascending")),
+            y=alt.Y(f"{field}:Q"),
+            text=alt.Text(f"{field}:Q", format=".1%"),
+        )
+        .transform_filter(alt.datum[field] != None)
+    )
+    return (bars + zero + labels).properties(
+        title="",
+        width=700,
+        height=250,
+    )
+
+
+def pop_heatmap(pop_summary, time_col, field="pop_pct"):
+    """Route x period grid of ``field`` changes, network total (ALL) on top.
+
+    Changes are clamped to +/-100% for the colour scale; periods without a
+    comparison are left blank.
+    """
+    time_label = change_label(time_col, field)
+    delta = field.replace("_pct", "_delta")
+    routes = sorted(pop_summary["route"].unique(), key=lambda route: (route != "ALL", route))
+    return alt.Chart(pop_summary).mark_rect().encode(
+        x=alt.X(f"{time_col}:O", title=None, axis=alt.Axis(labelAngle=-90)),
+        y=alt.Y("route:N", title=None, sort=routes),
+        color=alt.Color(
+            f"{field}:Q", title=f"{time_label} %",
+            scale=alt.Scale(scheme="redyellowgreen", domain=[-1, 1], clamp=True),
+            legend=alt.Legend(format=".0%")),
+        tooltip=[
+            alt.Tooltip("route:N", title="Route"),
+            alt.Tooltip(f"{time_col}:O", title=""),
+            alt.Tooltip("Shared_Profit:Q", title="Profit", format=",.0f"),
+            alt.Tooltip(f"{delta}:Q", title="Change", format=",.0f"),
+            alt.Tooltip(f"{field}:Q", title="Change %", format=".1%"),
+        ],
+    ).properties(
+        width=alt.Step(14),
+        height=alt.Step(22),
+        title=alt.TitleParams(text=f"{time_label} profit change", fontSize=20, color="#498684", anchor="start"),
+    )
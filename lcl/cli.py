@@ -0,0 +1,59 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from lcl.cache import IngestCache
+from lcl.cube import TIME_COLS
+from lcl.export import export_workbook
+from lcl.join import DEFAULT_PROFIT_POLICY, PROFIT_POLICIES
+from lcl.profiling import Profiler, log_to, maybe_stage
+from lcl.report import CHART_FORMATS, build_report, find_workbooks, write_report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m lcl",
+        description="Build the LCL report for a directory of route and rail workbooks.")
+    parser.add_argument("directory", help="directory containing the .xlsx workbooks")
+    parser.add_argument("-o", "--out", default="report", help="output directory (default: report)")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=CHART_FORMATS, default=["html", "json"],
+                        help="chart formats to write; png needs vl-convert-python")
+    parser.add_argument("--granularity", dest="time_cols", nargs="+", choices=TIME_COLS, default=TIME_COLS)
+    parser.add_argument("--jobs", type=int, default=None, help="processes rendering routes (default: CPU count)")
+    parser.add_argument("--workers", type=int, default=None, help="processes parsing workbooks (default: CPU count)")
+    parser.add_argument("--profit-policy", choices=PROFIT_POLICIES, default=DEFAULT_PROFIT_POLICY,
+                        help="how duplicate MMSCNs across rail rows are combined")
+    parser.add_argument("--approx-feu", action="store_true", help="estimate FEU with HyperLogLog")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the parsed-workbook cache")
+    parser.add_argument("--excel", action="store_true", help="also write every table and chart to report.xlsx")
+    parser.add_argument("--profile", action="store_true",
+                        help="log per-stage wall time, rows and peak memory as JSON lines on stderr")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    files = find_workbooks(args.directory)
+    if not files:
+        print(f"No .xlsx workbooks found in {args.directory}", file=sys.stderr)
+        return 1
+    profiler = None
+    if args.profile:
+        log_to(sys.stderr)
+        profiler = Profiler(trace_memory=True, source="cli", files=len(files))
+    start = time.perf_counter()
+    cache = None if args.no_cache else IngestCache()
+    cube = build_report(files, args.profit_policy, args.approx_feu, cache, args.workers, profiler)
+    if not cube.routes:
+        print("No shipment rows found in the route workbooks", file=sys.stderr)
+        return 1
+    written = write_report(cube, args.out, args.formats, args.time_cols, args.jobs, profiler)
+    if args.excel:
+        with maybe_stage(profiler, "excel", rows_in=len(cube.routes)):
+            export_workbook(cube, str(Path(args.out) / "report.xlsx"), args.time_cols)
+    print(f"{len(files)} workbooks, {len(cube.routes)} routes -> {len(written)} charts in {args.out} "
+          f"({time.perf_counter() - start:.1f}s)")
+    if cube.join_report is not None:
+        print(f"MMSCN join: {cube.join_report.as_dict()}")
+    return 0
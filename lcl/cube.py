@@ -0,0 +1,109 @@
+import pandas as pd
+
+from lcl.buckets import bucket_keys, label_buckets
+from lcl.distinct import EtdGroups, approx_count_distinct
+from lcl.pop import period_changes
+
+TIME_COLS = ["weeknum", "month", "quarter"]
+
+
+def profit_color(profit):
+    return profit.lt(0).map({True: "#CA001D", False: "#498684"})
+
+
+class Cube:
+    """Route x period aggregates for every granularity in TIME_COLS.
+
+    ``summary``, ``agg_summary`` and ``profit_summary`` map a time column to
+    the frame the report used to recompute on each rerun. ``profit_summary``
+    is empty when no rail profit file was uploaded, and so is
+    ``pop_summary``, the period-over-period and year-over-year profit
+    changes of every route (see ``lcl.pop``). ``join_report`` is the
+    profit join's JoinReport when the cube was built from uploads,
+    ``stages`` the profiled build stages, and ``charts`` memoizes chart
+    specs built from this cube's frames.
+    """
+
+    def __init__(self, summary, agg_summary, profit_summary, join_report=None, pop_summary=None):
+        self.summary = summary
+        self.agg_summary = agg_summary
+        self.profit_summary = profit_summary
+        self.pop_summary = pop_summary or {}
+        self.join_report = join_report
+        self.stages = []
+        self.charts = {}
+
+    @property
+    def has_profit(self):
+        return bool(self.profit_summary)
+
+    @property
+    def routes(self):
+        frame = self.summary[TIME_COLS[0]]
+        return sorted(frame["route"].dropna().unique())
+
+
+def _by_etd(df):
+    # Every ETD falls in exactly one week/month/quarter, so sums and distinct
+    # (container, ETD) counts per (route, ETD) roll up additively to all of them.
+    groups = EtdGroups(df)
+    base = pd.DataFrame({"route": groups.route.astype(str), "ETD": groups.etd})
+    base["weeknum"], base["month"], base["quarter"] = bucket_keys(base["ETD"])
+    base["Chrgb CBM"] = groups.sum(df["Chrgb CBM"])
+    base["FEU"] = groups.count_distinct(df["Containerno"])
+    if "Shared_Profit" in df.columns:
+        base["Shared_Profit"] = groups.sum(df["Shared_Profit"])
+    return base, groups
+
+
+def cube_from_periods(periods):
+    """Build a Cube from per-granularity (route, period key) aggregates.
+
+    ``periods`` maps each time column to a frame with route, the integer
+    period key under the time column's name, Chrgb CBM, FEU and, when
+    profit is known, Shared_Profit.
+    """
+    summary = {}
+    agg_summary = {}
+    profit_summary = {}
+    pop_summary = {}
+    for time_col, frame in periods.items():
+        frame = frame.sort_values(["route", time_col], ignore_index=True)
+        s = frame[["route", time_col, "Chrgb CBM", "FEU"]].copy()
+        s["TEU"] = s["FEU"]*2
+        s["AVG L/D"] = s["Chrgb CBM"]/s["FEU"]/76.3*100
+        s[time_col] = label_buckets(time_col, s[time_col])
+        summary[time_col] = s
+        agg_summary[time_col] = s.groupby("route", as_index=False).agg({
+            "TEU": "sum",
+            "Chrgb CBM": "sum",
+            "AVG L/D": "mean"
+        })
+        if "Shared_Profit" in frame.columns:
+            p = frame[["route", time_col, "Shared_Profit"]].sort_values(time_col, kind="stable")
+            p[time_col] = label_buckets(time_col, p[time_col])
+            p["color"] = profit_color(p["Shared_Profit"])
+            profit_summary[time_col] = p
+            pop_summary[time_col] = period_changes(frame, time_col)
+    return Cube(summary, agg_summary, profit_summary, pop_summary=pop_summary)
+
+
+def build_cube(df, approx_distinct=False):
+    """Aggregate joined shipments into a Cube.
+
+    With ``approx_distinct`` FEU is a HyperLogLog estimate per (route,
+    period) instead of an exact count, for histories too large to hash.
+    """
+    base, groups = _by_etd(df)
+    values = [col for col in ["Chrgb CBM", "FEU", "Shared_Profit"] if col in base.columns]
+    if approx_distinct:
+        keys, _ = groups.item_keys(df["Containerno"])
+    periods = {}
+    for time_col in TIME_COLS:
+        grouped = base.groupby(["route", time_col], as_index=False)
+        frame = grouped[values].sum()
+        if approx_distinct:
+            period_ids = grouped.ngroup().to_numpy()[groups.ids]
+            frame["FEU"] = approx_count_distinct(period_ids, keys, len(frame))
+        periods[time_col] = frame
+    return cube_from_periods(periods)
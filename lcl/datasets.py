@@ -0,0 +1,136 @@
+"""Process-wide registry of built reports, shared by every Streamlit session.
+
+Sessions that upload the same workbooks get one Cube. Its frames are
+frozen into Arrow-backed columns once, and each session's Lease gets a
+shallow view of them: the Arrow buffers are shared zero-copy, while pandas
+copy-on-write keeps a session's edits to its view away from the others.
+Datasets without leases are evicted least recently used first once the
+registry is over its byte budget.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+
+from lcl.cube import Cube
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def freeze_frame(df):
+    """Return ``df`` with immutable Arrow-backed columns."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def freeze_cube(cube):
+    frozen = Cube(
+        {col: freeze_frame(df) for col, df in cube.summary.items()},
+        {col: freeze_frame(df) for col, df in cube.agg_summary.items()},
+        {col: freeze_frame(df) for col, df in cube.profit_summary.items()},
+        cube.join_report,
+        {col: freeze_frame(df) for col, df in cube.pop_summary.items()},
+    )
+    frozen.stages = cube.stages
+    return frozen
+
+
+def view_cube(cube):
+    """A Cube over shallow (copy-on-write) copies of ``cube``'s frames, sharing its chart memo."""
+    view = Cube(
+        {col: df.copy(deep=False) for col, df in cube.summary.items()},
+        {col: df.copy(deep=False) for col, df in cube.agg_summary.items()},
+        {col: df.copy(deep=False) for col, df in cube.profit_summary.items()},
+        cube.join_report,
+        {col: df.copy(deep=False) for col, df in cube.pop_summary.items()},
+    )
+    view.stages = cube.stages
+    view.charts = cube.charts
+    return view
+
+
+def cube_nbytes(cube):
+    frames = [*cube.summary.values(), *cube.agg_summary.values(), *cube.profit_summary.values(),
+              *cube.pop_summary.values()]
+    return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+
+class Dataset:
+    def __init__(self, key, cube):
+        self.key = key
+        self.cube = cube
+        self.nbytes = cube_nbytes(cube)
+        self.refs = 0
+
+
+class Lease:
+    """A session's hold on a Dataset; released explicitly or when garbage collected."""
+
+    def __init__(self, registry, dataset):
+        self.key = dataset.key
+        self.cube = view_cube(dataset.cube)
+        self._finalizer = weakref.finalize(self, registry._release, dataset.key)
+
+    def release(self):
+        self._finalizer()
+
+
+class DatasetRegistry:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._datasets = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lease(self, key):
+        """Lease the dataset stored under ``key``, or None."""
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._datasets.move_to_end(key)
+            dataset.refs += 1
+        return Lease(self, dataset)
+
+    def put(self, key, cube):
+        """Freeze and store ``cube`` (unless another session already did) and lease it."""
+        frozen = freeze_cube(cube)
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is None:
+                dataset = self._datasets[key] = Dataset(key, frozen)
+                self._total += dataset.nbytes
+            self._datasets.move_to_end(key)
+            dataset.refs += 1
+            self._evict()
+        return Lease(self, dataset)
+
+    def _release(self, key):
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                dataset.refs -= 1
+                self._evict()
+
+    def _evict(self):
+        # Leased datasets stay, even over budget: their sessions still show them.
+        for key in [k for k, d in self._datasets.items() if d.refs <= 0]:
+            if self._total <= self.max_bytes:
+                break
+            self._total -= self._datasets.pop(key).nbytes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "datasets": len(self._datasets),
+                "leases": sum(d.refs for d in self._datasets.values()),
+                "mb": round(self._total / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,85 @@
+"""Distinct container counting on packed integer keys.
+
+A container counts once per (route, Containerno, ETD). Each column is
+reduced to integer codes once and the codes are packed into one int64 per
+row, so FEU for any grouping is a unique/bincount over integers instead of
+a drop_duplicates over several object columns. Codes are bounded by the row
+count, so packed pairs fit in int64 for any frame under two billion rows.
+"""
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = 12
+
+
+def codes(values):
+    """Return (int64 codes, distinct values); nulls get a code of their own."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        c = values.cat.codes.to_numpy().astype(np.int64)
+        uniques = values.cat.categories
+        if (c < 0).any():
+            c = np.where(c < 0, len(uniques), c)
+            uniques = uniques.append(pd.Index([np.nan]))
+        return c, uniques
+    c, uniques = pd.factorize(values, use_na_sentinel=False)
+    return c.astype(np.int64), uniques
+
+
+class EtdGroups:
+    """Rows grouped by (route, ETD), numbered in order of first appearance.
+
+    ``ids`` maps each row to its group; ``route`` and ``etd`` hold each
+    group's values.
+    """
+
+    def __init__(self, df):
+        route, routes = codes(df["route"])
+        etd, etds = codes(df["ETD"])
+        n_etd = max(len(etds), 1)
+        ids, packed = pd.factorize(route * n_etd + etd)
+        self.ids = ids.astype(np.int64)
+        self.n = len(packed)
+        self.route = np.asarray(routes, dtype=object)[packed // n_etd]
+        self.etd = pd.Series(etds[packed % n_etd])
+
+    def sum(self, values):
+        # Nulls are skipped, as in groupby().sum().
+        weights = np.nan_to_num(np.asarray(values, dtype=np.float64))
+        return np.bincount(self.ids, weights=weights, minlength=self.n)
+
+    def item_keys(self, values):
+        """Pack (group, value) into one int64 per row; returns (keys, n_values)."""
+        item, uniques = codes(values)
+        n_item = max(len(uniques), 1)
+        return self.ids * n_item + item, n_item
+
+    def count_distinct(self, values):
+        """Exact number of distinct ``values`` in each group."""
+        keys, n_item = self.item_keys(values)
+        return np.bincount(pd.unique(keys) // n_item, minlength=self.n)
+
+
+def approx_count_distinct(groups, keys, n_groups, precision=HLL_PRECISION):
+    """HyperLogLog estimate of the distinct ``keys`` in each group id.
+
+    Registers are kept sparse (one per observed (group, register) pair), so
+    memory follows the row count rather than n_groups * 2**precision.
+    Standard error is about 1.04 / sqrt(2**precision), 1.6% by default.
+    """
+    m = 1 << precision
+    h = pd.util.hash_array(np.asarray(keys, dtype=np.int64))
+    register = (h >> np.uint64(64 - precision)).astype(np.int64)
+    rest = (h << np.uint64(precision)) | np.uint64(1 << (precision - 1))
+    # 1-based position of the leftmost set bit in the remaining bits.
+    rank = (64 - np.floor(np.log2(rest.astype(np.float64)))).astype(np.int64)
+    registers = pd.Series(rank).groupby([np.asarray(groups, dtype=np.int64), register]).max()
+    group_of = registers.index.get_level_values(0).to_numpy()
+    filled = np.bincount(group_of, minlength=n_groups)
+    zeros = m - filled
+    # Empty registers add 2**0 each to the harmonic sum.
+    harmonic = np.bincount(group_of, weights=np.exp2(-registers.to_numpy()), minlength=n_groups) + zeros
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / harmonic
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    estimate = np.where((estimate <= 2.5 * m) & (zeros > 0), linear, estimate)
+    return np.where(filled > 0, np.rint(estimate), 0).astype(np.int64)
@@ -0,0 +1,185 @@
+"""Excel export of a whole Cube in one streaming pass.
+
+The workbook opens with an Overview sheet of every granularity's
+agg_summary, followed by one sheet per route and granularity. Each route
+sheet holds the route's totals, its summary table and, when profit is
+known, its profit and PoP/YoY table, plus native Excel charts over those
+ranges. xlsxwriter's constant_memory mode flushes each row to disk once the
+next row starts, so memory stays flat however many routes there are. It
+also means every sheet is written strictly top to bottom.
+"""
+import io
+import re
+
+import pandas as pd
+
+from lcl.cube import TIME_COLS
+
+GRANULARITY = {"weeknum": "Weekly", "month": "Monthly", "quarter": "Quarterly"}
+SUMMARY_COLUMNS = ["Chrgb CBM", "FEU", "TEU", "AVG L/D"]
+AGG_COLUMNS = ["TEU", "Chrgb CBM", "AVG L/D"]
+POP_COLUMNS = ["Shared_Profit", "pop_delta", "pop_pct", "yoy_delta", "yoy_pct"]
+POP_HEADERS = ["Profit (USD)", "PoP change", "PoP %", "YoY change", "YoY %"]
+# Profit tables start this many columns right of the summary table.
+POP_OFFSET = len(SUMMARY_COLUMNS) + 2
+CHART_COLUMN = POP_OFFSET + len(POP_COLUMNS) + 2
+SHEET_NAME_MAX = 31
+
+
+def sheet_name(route, time_col, used):
+    """A unique, Excel-legal sheet name ("XIAN-HAM Weekly")."""
+    suffix = f" {GRANULARITY[time_col]}"
+    base = re.sub(r"[\[\]:*?/\\']", "_", str(route))[:SHEET_NAME_MAX - len(suffix)] + suffix
+    name = base
+    n = 2
+    while name.lower() in used:
+        tag = f"~{n}"
+        name = base[:SHEET_NAME_MAX - len(tag)] + tag
+        n += 1
+    used.add(name.lower())
+    return name
+
+
+def _cell(value):
+    # NaN/NA become blank cells; numpy scalars become Python numbers.
+    if value is None or value is pd.NA or value != value:
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+class _Formats:
+    def __init__(self, workbook):
+        self.title = workbook.add_format({"bold": True, "font_size": 16, "font_color": "#225560"})
+        self.header = workbook.add_format({"bold": True, "bg_color": "#F0F7F6", "bottom": 1})
+        self.number = workbook.add_format({"num_format": "#,##0.00"})
+        self.integer = workbook.add_format({"num_format": "#,##0"})
+        self.percent = workbook.add_format({"num_format": "0.0%"})
+
+
+def _write_table(worksheet, row, col, frame, columns, headers, formats, number_formats):
+    """Write headers and rows of ``frame[columns]`` at (row, col); returns the next free row."""
+    worksheet.write_row(row, col, headers, formats.header)
+    for values in zip(*(frame[c].tolist() for c in columns)):
+        row += 1
+        for offset, (value, fmt) in enumerate(zip(values, number_formats)):
+            value = _cell(value)
+            if value is not None:
+                worksheet.write(row, col + offset, value, fmt)
+    return row + 1
+
+
+def _write_overview(workbook, cube, time_cols, formats):
+    worksheet = workbook.add_worksheet("Overview")
+    worksheet.set_column(0, 0, 22)
+    worksheet.set_column(1, len(AGG_COLUMNS), 14)
+    worksheet.write(0, 0, "LCL Report", formats.title)
+    row = 2
+    for time_col in time_cols:
+        worksheet.write(row, 0, GRANULARITY[time_col], formats.header)
+        agg = cube.agg_summary[time_col]
+        row = _write_table(worksheet, row + 1, 0, agg, ["route"] + AGG_COLUMNS, ["Route"] + AGG_COLUMNS, formats,
+                           [None, formats.integer, formats.number, formats.number]) + 1
+
+
+def _volume_chart(workbook, name, first, last):
+    teu = workbook.add_chart({"type": "column"})
+    teu.add_series({
+        "name": "TEU", "categories": [name, first, 0, last, 0], "values": [name, first, 3, last, 3],
+        "fill": {"color": "#498684"},
+    })
+    ld = workbook.add_chart({"type": "line"})
+    ld.add_series({
+        "name": "AVG L/D", "categories": [name, first, 0, last, 0], "values": [name, first, 4, last, 4],
+        "y2_axis": True, "line": {"color": "#CA001D"},
+    })
+    teu.combine(ld)
+    teu.set_title({"name": "TEU / AVG L/D"})
+    teu.set_y_axis({"name": "TEU"})
+    ld.set_y2_axis({"name": "AVG L/D"})
+    teu.set_size({"width": 760, "height": 300})
+    return teu
+
+
+def _profit_chart(workbook, name, first, last):
+    col = POP_OFFSET
+    chart = workbook.add_chart({"type": "column"})
+    chart.add_series({
+        "name": "Profit", "categories": [name, first, col, last, col], "values": [name, first, col + 1, last, col + 1],
+        "fill": {"color": "#498684"}, "invert_if_negative": True, "invert_if_negative_color": "#CA001D",
+    })
+    change = workbook.add_chart({"type": "line"})
+    change.add_series({
+        "name": "PoP %", "categories": [name, first, col, last, col], "values": [name, first, col + 3, last, col + 3],
+        "y2_axis": True, "line": {"color": "#2ca02c"},
+    })
+    chart.combine(change)
+    chart.set_title({"name": "Shared profit / PoP %"})
+    chart.set_y_axis({"name": "USD"})
+    change.set_y2_axis({"name": "PoP %", "num_format": "0%"})
+    chart.set_size({"width": 760, "height": 300})
+    return chart
+
+
+def _by_route(frame):
+    return dict(iter(frame.groupby("route", sort=False))) if frame is not None else {}
+
+
+def _write_route(workbook, route, time_col, name, agg, summary, pop, formats):
+    worksheet = workbook.add_worksheet(name)
+    worksheet.set_column(0, len(SUMMARY_COLUMNS) + len(POP_COLUMNS) + POP_OFFSET, 12)
+    worksheet.write(0, 0, f"{route} · {GRANULARITY[time_col]}", formats.title)
+    _write_table(worksheet, 2, 0, agg, AGG_COLUMNS, ["Total TEU", "Total CBM", "Mean AVG L/D"], formats,
+                 [formats.integer, formats.number, formats.number])
+
+    # The summary and the profit table share rows, so both are written in
+    # one top-to-bottom pass.
+    top = 6
+    worksheet.write_row(top, 0, ["Period"] + SUMMARY_COLUMNS, formats.header)
+    if pop is not None:
+        worksheet.write_row(top, POP_OFFSET, ["Period"] + POP_HEADERS, formats.header)
+    left = list(zip(*(summary[c].tolist() for c in [time_col] + SUMMARY_COLUMNS)))
+    right = list(zip(*(pop[c].tolist() for c in [time_col] + POP_COLUMNS))) if pop is not None else []
+    left_formats = [None, formats.number, formats.integer, formats.integer, formats.number]
+    right_formats = [None, formats.number, formats.number, formats.percent, formats.number, formats.percent]
+    for i in range(max(len(left), len(right))):
+        row = top + 1 + i
+        for values, col, fmts in ((left, 0, left_formats), (right, POP_OFFSET, right_formats)):
+            if i < len(values):
+                for offset, (value, fmt) in enumerate(zip(values[i], fmts)):
+                    value = _cell(value)
+                    if value is not None:
+                        worksheet.write(row, col + offset, value, fmt)
+
+    if left:
+        worksheet.insert_chart(top, CHART_COLUMN, _volume_chart(workbook, name, top + 1, top + len(left)))
+    if right:
+        worksheet.insert_chart(top + 16, CHART_COLUMN, _profit_chart(workbook, name, top + 1, top + len(right)))
+
+
+def export_workbook(cube, out=None, time_cols=TIME_COLS):
+    """Write ``cube`` as an .xlsx to the path or file object ``out``; returns the bytes when ``out`` is None."""
+    import xlsxwriter
+
+    target = io.BytesIO() if out is None else out
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True, "nan_inf_to_errors": True})
+    formats = _Formats(workbook)
+    _write_overview(workbook, cube, time_cols, formats)
+    # Split each table by route once rather than filtering it per sheet.
+    parts = {
+        time_col: (
+            _by_route(cube.agg_summary[time_col]),
+            _by_route(cube.summary[time_col]),
+            _by_route(cube.pop_summary.get(time_col)),
+        )
+        for time_col in time_cols
+    }
+    used = {"overview"}
+    for route in cube.routes:
+        for time_col in time_cols:
+            agg, summary, pop = parts[time_col]
+            _write_route(workbook, route, time_col, sheet_name(route, time_col, used),
+                         agg[route], summary[route], pop.get(route), formats)
+    workbook.close()
+    if out is None:
+        return target.getvalue()
+    return None
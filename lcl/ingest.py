@@ -0,0 +1,234 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from lcl.buckets import add_buckets
+from lcl.cache import content_hash
+from lcl.normalize import concat_shipments, normalize_shipments
+from lcl.reader import RAIL_COLUMNS, ROUTE_COLUMNS, iter_sheets, list_sheets, read_first_sheet
+
+# Route workbooks larger than this are split so each sheet is parsed by its
+# own worker; smaller ones are parsed as a single job.
+SPLIT_SHEETS_BYTES = 1024 * 1024
+# Below this many pending bytes the pool start-up costs more than it saves.
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers():
+    return int(os.environ.get("LCL_INGEST_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def is_rail_file(filename):
+    return "rail" in filename.lower()
+
+
+def parse_rail(data):
+    loss_df = read_first_sheet(data, RAIL_COLUMNS)
+    if loss_df is None:
+        return normalize_shipments(pd.DataFrame({"Shared_Profit": pd.Series(dtype="float64"), "MMSCN": pd.Series(dtype=object)}))
+    if "SHAE" in loss_df.attrs["found"]:
+        loss_df["MMSCN"] = loss_df["SHAE"]
+    else:
+        loss_df["MMSCN"] = loss_df[4]
+    loss_df["Shared_Profit"] = loss_df["Formula.7"]/2
+    return normalize_shipments(loss_df[["Shared_Profit", "MMSCN"]])
+
+
+def parse_route_sheet(sheet_name, df):
+    if df.dropna(how='all').empty:
+        return None
+    df["route"] = sheet_name
+    return add_buckets(df)
+
+
+def iter_route_sheets(data, sheet_names=None, timings=None):
+    """Yield (sheet_name, frame or None) as each sheet is parsed; None for empty sheets.
+
+    Frames already have the compact dtypes of lcl.normalize, so pool workers
+    send categoricals back rather than object columns. ``timings`` (a
+    Counter) accumulates the seconds and rows of reading ("parse"), date
+    bucketing ("bucket") and dtype compaction ("normalize") separately.
+    """
+    start = time.perf_counter()
+    for sheet_name, df in iter_sheets(data, ROUTE_COLUMNS, sheet_names):
+        read = time.perf_counter()
+        parsed = parse_route_sheet(sheet_name, df)
+        bucketed = time.perf_counter()
+        if parsed is not None:
+            parsed = normalize_shipments(parsed)
+        if timings is not None:
+            timings["parse"] += read - start
+            timings["parse_rows"] += len(df)
+            timings["bucket"] += bucketed - read
+            timings["bucket_rows_in"] += len(df)
+            timings["bucket_rows"] += len(parsed) if parsed is not None else 0
+            timings["normalize"] += time.perf_counter() - bucketed
+        yield sheet_name, parsed
+        start = time.perf_counter()
+
+
+def combine_route_sheets(dfs):
+    return concat_shipments(dfs)
+
+
+def _parse_job(kind, data, sheet_names, progress=None):
+    """Parse one job; returns (frames, parsed sheet names, timings as in iter_route_sheets).
+
+    The names include route sheets that produced no frame.
+    """
+    timings = Counter(jobs=1)
+    if kind == "rail":
+        start = time.perf_counter()
+        df = parse_rail(data)
+        timings["parse"] += time.perf_counter() - start
+        timings["parse_rows"] += len(df)
+        return [df], [], timings
+    dfs = []
+    parsed = []
+    for sheet_name, df in iter_route_sheets(data, sheet_names, timings):
+        parsed.append(sheet_name)
+        if progress is not None:
+            progress(sheet_name)
+        if df is not None:
+            dfs.append(df)
+    return dfs, parsed, timings
+
+
+def _plan_jobs(kind, data):
+    if kind == "route" and len(data) > SPLIT_SHEETS_BYTES:
+        names = list_sheets(data)
+        if len(names) > 1:
+            return [(kind, data, [name]) for name in names]
+    return [(kind, data, None)]
+
+
+def get_pool(workers):
+    """Return the shared worker pool, kept alive across Streamlit reruns."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn rather than fork: Streamlit runs scripts on threads.
+            ctx = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def _iter_jobs(jobs, workers, progress=None):
+    """Yield (job index, parsed frames, timings) as jobs finish.
+
+    In-process jobs call ``progress(job index, sheet_name)`` after every
+    sheet; pooled jobs once per job, for each sheet it parsed.
+    """
+    if workers <= 1 or len(jobs) <= 1 or sum(len(job[1]) for job in jobs) < PARALLEL_MIN_BYTES:
+        for n, job in enumerate(jobs):
+            on_sheet = (lambda sheet_name, n=n: progress(n, sheet_name)) if progress is not None else None
+            dfs, _, timings = _parse_job(*job, on_sheet)
+            yield n, dfs, timings
+        return
+    pool = get_pool(workers)
+    futures = {pool.submit(_parse_job, *job): n for n, job in enumerate(jobs)}
+    for future in as_completed(futures):
+        n = futures[future]
+        dfs, parsed, timings = future.result()
+        if progress is not None:
+            for sheet_name in parsed:
+                progress(n, sheet_name)
+        yield n, dfs, timings
+
+
+def dataset_key(files):
+    """Identify a set of uploads by kind and content, ignoring upload order."""
+    parts = sorted(f"{'rail' if is_rail_file(f.name) else 'route'}-{content_hash(f.getvalue())}" for f in files)
+    return content_hash("|".join(parts).encode())
+
+
+def iter_uploads(files, cache=None, workers=None, progress=None, timings=None):
+    """Parse uploaded workbooks, yielding (index, kind, frame) as each file is ready.
+
+    Cached files come first, the rest in the order they finish. Files missing
+    from ``cache`` are fanned out over a process pool, large route workbooks
+    one sheet per job. ``progress(index, sheet_name)`` reports parsed route
+    sheets, empty ones included. ``timings`` (a Counter) gets the reading and
+    bucketing time of every parse job added to it, summed over the workers.
+    """
+    if workers is None:
+        workers = default_workers()
+    pending = []
+    for i, file in enumerate(files):
+        data = file.getvalue()
+        kind = "rail" if is_rail_file(file.name) else "route"
+        key = cache.key(kind, data) if cache is not None else None
+        df = cache.get(key) if cache is not None else None
+        if df is not None:
+            yield i, kind, df
+        else:
+            pending.append((i, kind, key, _plan_jobs(kind, data)))
+
+    jobs = []
+    owner = []
+    for n, (i, _, _, file_jobs) in enumerate(pending):
+        jobs += file_jobs
+        owner += [n] * len(file_jobs)
+    parts = [[None] * len(file_jobs) for *_, file_jobs in pending]
+    remaining = [len(file_jobs) for *_, file_jobs in pending]
+    first_job = [owner.index(n) for n in range(len(pending))]
+
+    def on_sheet(job, sheet_name):
+        progress(pending[owner[job]][0], sheet_name)
+
+    for job, dfs, job_timings in _iter_jobs(jobs, workers, on_sheet if progress is not None else None):
+        if timings is not None:
+            timings.update(job_timings)
+        n = owner[job]
+        # Sheets keep their workbook order whatever order the jobs finish in.
+        parts[n][job - first_job[n]] = dfs
+        remaining[n] -= 1
+        if remaining[n]:
+            continue
+        i, kind, key, _ = pending[n]
+        dfs = [df for job_dfs in parts[n] for df in job_dfs]
+        df = dfs[0] if kind == "rail" else combine_route_sheets(dfs)
+        parts[n] = None
+        if cache is not None:
+            cache.put(key, df)
+        yield i, kind, df
+
+
+def load_uploads(files, cache=None, workers=None, timings=None):
+    """Parse uploaded workbooks into (route frames, rail profit frames), in upload order."""
+    entries = [None] * len(files)
+    for i, kind, df in iter_uploads(files, cache, workers, timings=timings):
+        entries[i] = (kind, df)
+
+    dfs = []
+    loss_dfs = []
+    for kind, df in entries:
+        if kind == "rail":
+            loss_dfs.append(df)
+        elif not df.empty:
+            dfs.append(df)
+    return dfs, loss_dfs
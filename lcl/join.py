@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from lcl.normalize import concat_shipments
+
+# How duplicate MMSCNs across rail rows are collapsed to one profit value:
+#   sum    - add up every row (the old row-level merge's profit totals)
+#   latest - rows from the last uploaded rail file that has the key
+#   first  - rows from the first uploaded rail file that has the key
+PROFIT_POLICIES = ["sum", "latest", "first"]
+DEFAULT_PROFIT_POLICY = "sum"
+
+
+class JoinReport:
+    def __init__(self, matched, missing, duplicated, unused):
+        self.matched = matched
+        self.missing = missing
+        self.duplicated = duplicated
+        self.unused = unused
+
+    def as_dict(self):
+        return {
+            "matched": self.matched,
+            "missing": self.missing,
+            "duplicated": self.duplicated,
+            "unused": self.unused,
+        }
+
+    def __repr__(self):
+        return f"JoinReport({self.as_dict()})"
+
+
+def collapse_profit(loss_dfs, policy=DEFAULT_PROFIT_POLICY):
+    """Return (Shared_Profit Series with one row per MMSCN, duplicated key count)."""
+    if policy not in PROFIT_POLICIES:
+        raise ValueError(f"Unknown profit policy {policy!r}, expected one of {PROFIT_POLICIES}")
+    loss_df = pd.concat(
+        [df[["MMSCN", "Shared_Profit"]].assign(file=i) for i, df in enumerate(loss_dfs)],
+        ignore_index=True,
+    )
+    loss_df = loss_df[loss_df["MMSCN"].notna()]
+    counts = loss_df["MMSCN"].value_counts(sort=False)
+    duplicated = int((counts > 1).sum())
+    if policy != "sum":
+        pick = loss_df.groupby("MMSCN", sort=False, observed=True)["file"].transform("max" if policy == "latest" else "min")
+        loss_df = loss_df[loss_df["file"] == pick]
+    profit = loss_df.groupby("MMSCN", sort=False, observed=True)["Shared_Profit"].sum(min_count=1)
+    profit.index = pd.Index(profit.index, dtype=object)
+    return profit, duplicated
+
+
+def attach_profit(df, profit):
+    """Add Shared_Profit to ``df`` in place through a hash lookup on MMSCN.
+
+    For a categorical MMSCN only the distinct categories are hashed.
+    """
+    keys = df["MMSCN"]
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        key_codes = keys.cat.codes.to_numpy()
+        category_codes = np.append(profit.index.get_indexer(keys.cat.categories), -1)
+        codes = category_codes[key_codes]
+    else:
+        codes = profit.index.get_indexer(keys)
+    # Unmatched keys get code -1, which picks the trailing NaN.
+    values = np.append(profit.to_numpy(dtype="float64"), np.nan)
+    df["Shared_Profit"] = values[codes]
+    hit = codes >= 0
+    matched = keys[hit].nunique()
+    missing = keys[~hit].nunique()
+    return matched, missing, len(profit) - matched
+
+
+def join_shipments(dfs, loss_dfs, policy=DEFAULT_PROFIT_POLICY):
+    """Concatenate route frames and attach one profit value per MMSCN.
+
+    Returns (frame, JoinReport or None when there is no rail file).
+    """
+    df = concat_shipments(dfs)
+    if not loss_dfs:
+        return df, None
+    profit, duplicated = collapse_profit(loss_dfs, policy)
+    matched, missing, unused = attach_profit(df, profit)
+    return df, JoinReport(matched, missing, duplicated, unused)
@@ -0,0 +1,80 @@
+"""Compact dtypes for shipment frames.
+
+Only the projected columns survive parsing (see ``lcl.reader``), and they
+are stored as:
+
+    route, Containerno, MMSCN   category   (int8-int32 codes)
+    ETD                         datetime64 8 bytes
+    weeknum, month, quarter     int32      3 x 4 bytes
+    Chrgb CBM, Shared_Profit    float64    2 x 8 bytes
+
+which budgets roughly 48 bytes per shipment row plus one copy of each
+distinct route, container and MMSCN value. MMSCNs are close to unique per
+row, so plan on about 110 bytes per joined row (~110 MB per million
+shipments). CBM and profit stay float64: float32 would save 8 bytes a row,
+but its rounding survives widening and shows in every sum (13.45 becomes
+13.4500002861).
+"""
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+CATEGORY_COLUMNS = ["route", "Containerno", "MMSCN"]
+FLOAT_COLUMNS = ["Chrgb CBM", "Shared_Profit"]
+
+
+def _as_category(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    # Mixed int/str keys stay as their Python objects inside the categories.
+    return values.astype("object").astype("category")
+
+
+def normalize_shipments(df):
+    """Cast shipment columns to the compact dtypes above, without copying other columns."""
+    cols = {}
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            cols[col] = _as_category(df[col])
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            cols[col] = df[col].astype("float64")
+    return df.assign(**cols)
+
+
+def empty_shipments():
+    """A route frame with no rows but the dtypes above, for uploads without shipments."""
+    return pd.DataFrame({
+        "route": pd.Categorical([]),
+        "ETD": pd.Series(dtype="datetime64[ns]"),
+        "Chrgb CBM": pd.Series(dtype="float64"),
+        "Containerno": pd.Categorical([]),
+        "MMSCN": pd.Categorical([]),
+        "weeknum": pd.Series(dtype="int32"),
+        "month": pd.Series(dtype="int32"),
+        "quarter": pd.Series(dtype="int32"),
+    })
+
+
+def concat_shipments(dfs):
+    """Concatenate normalized frames, unioning categories instead of falling back to object."""
+    if not dfs:
+        return empty_shipments()
+    if len(dfs) == 1:
+        return dfs[0].reset_index(drop=True)
+    unioned = {}
+    for col in CATEGORY_COLUMNS:
+        if all(col in d.columns for d in dfs):
+            try:
+                unioned[col] = union_categoricals([_as_category(d[col]) for d in dfs], ignore_order=True)
+            except TypeError:
+                # Category dtypes differ between files (e.g. int vs str keys); cast after the concat.
+                pass
+    # Unioned columns stay out of the concat, which would first widen them to object.
+    columns = list(dict.fromkeys(col for d in dfs for col in d.columns))
+    df = pd.concat([d.drop(columns=list(unioned)) for d in dfs], ignore_index=True)
+    df = df.assign(**unioned)[columns]
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = _as_category(df[col])
+    return df
+
@@ -0,0 +1,52 @@
+"""Period-over-period and year-over-year changes for every route in one pass.
+
+Rows are matched on packed (route, period) integer keys: the previous
+period is the calendar one (``period_ordinal`` - 1, across year ends), and
+the same period last year is the period key minus its year step. A change
+is NaN when the period it compares with has no row.
+"""
+import numpy as np
+import pandas as pd
+
+from lcl.buckets import YEAR_STEP, label_buckets, period_ordinal
+
+ALL_ROUTES = "ALL"
+
+
+def _lookup(route, position, lag):
+    """Row of (same route, position - lag) for every row, or -1."""
+    low = position.min() if len(position) else 0
+    span = position.max() - low + lag + 1 if len(position) else 1
+    packed = route * span + (position - low + lag)
+    return pd.Index(packed).get_indexer(packed - lag)
+
+
+def _change(values, before_row):
+    before = np.where(before_row >= 0, values[before_row], np.nan)
+    delta = values - before
+    # Relative to the size of the earlier value, so a smaller loss is a gain.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = delta / np.abs(before)
+    pct[~np.isfinite(pct)] = np.nan
+    return delta, pct
+
+
+def period_changes(frame, time_col, value="Shared_Profit"):
+    """PoP and YoY changes of ``value`` per route, plus the ALL_ROUTES total.
+
+    ``frame`` has one row per (route, integer period key under ``time_col``).
+    Returns route, the period label, ``value``, pop_delta, pop_pct,
+    yoy_delta and yoy_pct, sorted by route and period.
+    """
+    total = frame.groupby(time_col, as_index=False)[value].sum()
+    total.insert(0, "route", ALL_ROUTES)
+    df = pd.concat([frame[["route", time_col, value]], total], ignore_index=True)
+    route, _ = pd.factorize(df["route"])
+    route = route.astype(np.int64)
+    keys = df[time_col].to_numpy(dtype=np.int64)
+    values = df[value].to_numpy(dtype=np.float64)
+    df["pop_delta"], df["pop_pct"] = _change(values, _lookup(route, period_ordinal(time_col, keys), 1))
+    df["yoy_delta"], df["yoy_pct"] = _change(values, _lookup(route, keys, YEAR_STEP[time_col]))
+    df = df.sort_values(["route", time_col], ignore_index=True)
+    df[time_col] = label_buckets(time_col, df[time_col])
+    return df
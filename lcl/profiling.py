@@ -0,0 +1,213 @@
+"""Per-stage wall time, row counts and peak memory for the report pipeline.
+
+Each finished stage is logged as one JSON line on the ``lcl.profile``
+logger; set LCL_PROFILE_LOG to a file path to collect them.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+log = logging.getLogger("lcl.profile")
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# How often open "rss" stages sample the resident set size.
+RSS_INTERVAL = 0.01
+
+
+def log_to(stream_or_path):
+    """Send profile lines to a file path or stream (e.g. sys.stderr)."""
+    if isinstance(stream_or_path, str):
+        handler = logging.FileHandler(stream_or_path, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(stream_or_path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
+if os.environ.get("LCL_PROFILE_LOG"):
+    log_to(os.environ["LCL_PROFILE_LOG"])
+
+
+class Stage:
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.wall_ms = None
+        self.peak_mb = None
+        self.detail = {}
+
+    def as_dict(self):
+        record = {
+            "stage": self.name,
+            "wall_ms": round(self.wall_ms, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "peak_mb": self.peak_mb,
+        }
+        record.update(self.detail)
+        return record
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None without /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _HeapTracer:
+    """Process-wide tracemalloc, shared by every thread's stages.
+
+    Tracing starts with the first open stage and stops with the last, so one
+    stage never stops it under another. The peak is process-wide too: only a
+    stage that opened while no other traced stage was running resets it and
+    reports a peak (which then includes other threads' allocations); the
+    others report None rather than a corrupted figure.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = 0
+        self._started = False
+
+    def enter(self):
+        """Returns the heap size at entry when this stage owns the peak, else None."""
+        with self._lock:
+            self._open += 1
+            if self._open > 1:
+                return None
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            tracemalloc.reset_peak()
+            return tracemalloc.get_traced_memory()[0]
+
+    def exit(self, base):
+        with self._lock:
+            peak = tracemalloc.get_traced_memory()[1] if base is not None else None
+            self._open -= 1
+            if self._open == 0 and self._started:
+                tracemalloc.stop()
+                self._started = False
+        return peak - base if base is not None else None
+
+
+class _RssSampler:
+    """Peak resident memory of every open stage, sampled on one shared thread.
+
+    Cheap enough for a server with concurrent sessions, but process-wide and
+    sampled every RSS_INTERVAL, so it includes other threads and can miss
+    short spikes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open = {}
+        self._thread = None
+
+    def enter(self, key):
+        rss = current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            self._open[key] = [rss, rss]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="lcl-rss", daemon=True)
+                self._thread.start()
+
+    def exit(self, key):
+        rss = current_rss()
+        with self._lock:
+            entry = self._open.pop(key, None)
+        if entry is None:
+            return None
+        base, peak = entry
+        return max(peak, rss or 0) - base
+
+    def _run(self):
+        while True:
+            rss = current_rss()
+            with self._lock:
+                if not self._open:
+                    self._thread = None
+                    return
+                for entry in self._open.values():
+                    entry[1] = max(entry[1], rss)
+            time.sleep(RSS_INTERVAL)
+
+
+_heap = _HeapTracer()
+_rss = _RssSampler()
+
+
+class Profiler:
+    """Collects Stage records for one pipeline run.
+
+    ``trace_memory`` adds a per-stage peak_mb: True (or "heap") tracks the
+    Python heap, numpy and pandas buffers included, with tracemalloc, which
+    slows every thread in the process while a stage is open; "rss" samples
+    the process's resident memory instead, at almost no cost, for servers.
+    Work done in worker processes is not counted either way.
+    """
+
+    def __init__(self, trace_memory=False, **context):
+        self.trace_memory = "heap" if trace_memory is True else trace_memory
+        self.context = context
+        self.run_id = uuid.uuid4().hex[:12]
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        record = Stage(name, rows_in)
+        if self.trace_memory == "heap":
+            base = _heap.enter()
+        elif self.trace_memory == "rss":
+            _rss.enter(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.wall_ms = (time.perf_counter() - start) * 1000
+            if self.trace_memory:
+                peak = _heap.exit(base) if self.trace_memory == "heap" else _rss.exit(record)
+                record.peak_mb = round(peak / 2**20, 1) if peak is not None else None
+            self.stages.append(record)
+            self.emit(record)
+
+    def add(self, name, wall_ms, rows_in=None, rows_out=None, **detail):
+        """Record a stage timed elsewhere, e.g. summed over worker processes."""
+        record = Stage(name, rows_in)
+        record.wall_ms = wall_ms
+        record.rows_out = rows_out
+        record.detail.update(detail)
+        self.stages.append(record)
+        self.emit(record)
+
+    def emit(self, record):
+        if log.isEnabledFor(logging.INFO):
+            line = {"ts": round(time.time(), 3), "run": self.run_id, **self.context, **record.as_dict()}
+            log.info(json.dumps(line, default=str))
+
+    def records(self):
+        return [stage.as_dict() for stage in self.stages]
+
+
+@contextmanager
+def maybe_stage(profiler, name, rows_in=None):
+    """``profiler.stage`` when a profiler is given, else a throwaway Stage."""
+    if profiler is None:
+        yield Stage(name, rows_in)
+    else:
+        with profiler.stage(name, rows_in) as record:
+            yield record
+
@@ -0,0 +1,171 @@
+import io
+import os
+
+import openpyxl
+import pandas as pd
+
+# Columns are converted to typed arrays every CHUNK_ROWS rows, so at most one
+# chunk of Python cell objects is alive at a time.
+CHUNK_ROWS = 65536
+
+ROUTE_COLUMNS = {"ETD": "datetime", "Chrgb CBM": "float", "Containerno": "raw", "MMSCN": "raw"}
+# Rail exports carry the MMSCN in "SHAE" or, in older layouts, the 5th column.
+RAIL_COLUMNS = {"SHAE": "raw", 4: "raw", "Formula.7": "float"}
+
+
+def _convert_datetime(values):
+    return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+
+
+def _convert_float(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("float64")
+
+
+def _convert_raw(values):
+    return pd.Series(values)
+
+
+CONVERTERS = {
+    "datetime": _convert_datetime,
+    "float": _convert_float,
+    "raw": _convert_raw,
+}
+
+
+def _openpyxl_sheets(data, sheet_names=None):
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        for name in sheet_names or wb.sheetnames:
+            yield name, wb[name].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _calamine_rows(sheet):
+    # Rows start at the sheet's first used column; pad them back to column A
+    # so positional keys and "Unnamed: i" names match pd.read_excel.
+    pad = [""] * sheet.start[1] if sheet.start else []
+    for row in sheet.iter_rows():
+        yield pad + row
+
+
+def _calamine_sheets(data, sheet_names=None):
+    from python_calamine import CalamineWorkbook
+
+    wb = CalamineWorkbook.from_filelike(io.BytesIO(data))
+    for name in sheet_names or wb.sheet_names:
+        yield name, _calamine_rows(wb.get_sheet_by_name(name))
+
+
+# name -> fn(data, sheet_names) yielding (sheet_name, row iterator)
+ENGINES = {"openpyxl": _openpyxl_sheets}
+PREFERRED_ENGINES = ["calamine", "openpyxl"]
+
+try:
+    import python_calamine  # noqa: F401
+except ImportError:
+    pass
+else:
+    ENGINES["calamine"] = _calamine_sheets
+
+
+def register_engine(name, fn):
+    ENGINES[name] = fn
+
+
+def get_engine(name=None):
+    name = name or os.environ.get("LCL_XLSX_ENGINE")
+    if name:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown xlsx engine {name!r}, available: {sorted(ENGINES)}")
+        return ENGINES[name]
+    for name in PREFERRED_ENGINES:
+        if name in ENGINES:
+            return ENGINES[name]
+    return ENGINES["openpyxl"]
+
+
+def dedupe_header(header):
+    """Name header cells the way ``pd.read_excel`` does ("Formula.7", "Unnamed: 3")."""
+    names = []
+    counts = {}
+    for i, name in enumerate(header):
+        if name is None or name == "":
+            name = f"Unnamed: {i}"
+        cur = counts.get(name, 0)
+        counts[name] = cur + 1
+        if cur > 0:
+            name = f"{name}.{cur}"
+            counts[name] = counts.get(name, 0) + 1
+        names.append(name)
+    return names
+
+
+def _project(rows, columns):
+    header = next(rows, None)
+    if header is None:
+        return None
+    names = dedupe_header(header)
+    index = {name: i for i, name in enumerate(names)}
+    # Positional (int) keys select by column number, named keys by header.
+    positions = []
+    for col in columns:
+        if isinstance(col, int):
+            positions.append(col if col < len(names) else None)
+        else:
+            positions.append(index.get(col))
+
+    kinds = [CONVERTERS[kind] for kind in columns.values()]
+    buffers = [[] for _ in columns]
+    chunks = [[] for _ in columns]
+
+    def flush():
+        for convert, buf, out in zip(kinds, buffers, chunks):
+            out.append(convert(buf))
+            buf.clear()
+
+    n = 0
+    for row in rows:
+        values = [row[p] if p is not None and p < len(row) else None for p in positions]
+        values = [None if v == "" else v for v in values]
+        if all(v is None for v in values):
+            continue
+        for buf, v in zip(buffers, values):
+            buf.append(v)
+        n += 1
+        if n % CHUNK_ROWS == 0:
+            flush()
+    if n % CHUNK_ROWS or not n:
+        flush()
+
+    data = {}
+    for col, parts in zip(columns, chunks):
+        data[col] = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    df = pd.DataFrame(data)
+    df.attrs["found"] = [col for col, p in zip(columns, positions) if p is not None]
+    return df
+
+
+def iter_sheets(data, columns, sheet_names=None, engine=None):
+    """Stream sheets and keep only ``columns``, yielding (sheet_name, DataFrame).
+
+    ``columns`` maps a header name (or 0-based column number) to a converter
+    in CONVERTERS. Columns missing from a sheet come back all-null and are
+    left out of ``df.attrs["found"]``. Sheets without a header row are skipped.
+    """
+    for name, rows in get_engine(engine)(data, sheet_names):
+        df = _project(iter(rows), columns)
+        if df is not None:
+            yield name, df
+
+
+def read_first_sheet(data, columns, engine=None):
+    sheets = iter_sheets(data, columns, engine=engine)
+    try:
+        return next(sheets, (None, None))[1]
+    finally:
+        sheets.close()
+
+
+def list_sheets(data, engine=None):
+    return [name for name, _ in get_engine(engine)(data)]
@@ -0,0 +1,184 @@
+"""Headless report engine shared by the Streamlit app and the CLI."""
+import multiprocessing
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from lcl.charts import (AXIS_RANGES, all_profit_chart, all_routes_chart, make_profit_chart, make_wow_chart, pop_heatmap,
+                        route_chart)
+from lcl.cube import TIME_COLS, build_cube
+from lcl.ingest import load_uploads
+from lcl.join import DEFAULT_PROFIT_POLICY, join_shipments
+from lcl.profiling import maybe_stage
+
+CHART_FORMATS = ["html", "json", "png"]
+
+
+class WorkbookFile:
+    """A workbook on disk with the ``name``/``getvalue()`` of a Streamlit upload."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+
+    def getvalue(self):
+        return self.path.read_bytes()
+
+
+def find_workbooks(directory):
+    paths = sorted(Path(directory).glob("*.xlsx"))
+    # Excel's lock files ("~$name.xlsx") are not workbooks.
+    return [WorkbookFile(p) for p in paths if not p.name.startswith("~$")]
+
+
+def build_report(files, profit_policy=DEFAULT_PROFIT_POLICY, approx_distinct=False, cache=None, workers=None,
+                 profiler=None):
+    """Parse, join and aggregate uploads into a Cube.
+
+    With a Profiler, the ingest, join and cube stages are timed and
+    ``cube.stages`` keeps their records; see ``add_parse_stages`` for the
+    split of ingest into reading and date bucketing.
+    """
+    timings = Counter()
+    with maybe_stage(profiler, "ingest", rows_in=len(files)) as stage:
+        hits = (cache.hits + cache.disk_hits) if cache is not None else 0
+        dfs, loss_dfs = load_uploads(files, cache, workers, timings)
+        stage.rows_out = sum(len(df) for df in dfs) + sum(len(df) for df in loss_dfs)
+        if cache is not None:
+            stage.detail["cached_files"] = cache.hits + cache.disk_hits - hits
+    add_parse_stages(profiler, timings)
+    cube = cube_from_frames(dfs, loss_dfs, profit_policy, approx_distinct, profiler)
+    if profiler is not None:
+        cube.stages = profiler.records()
+    return cube
+
+
+def add_parse_stages(profiler, timings):
+    """Record the parse jobs' reading, date bucketing and dtype compaction as ingest.* stages.
+
+    Their wall_ms is summed over the jobs, which may have run in parallel
+    worker processes, so together they can exceed the ingest stage.
+    """
+    if profiler is None or not timings["jobs"]:
+        return
+    profiler.add("ingest.parse", timings["parse"] * 1000, rows_out=timings["parse_rows"], jobs=timings["jobs"])
+    profiler.add("ingest.bucket", timings["bucket"] * 1000, rows_in=timings["bucket_rows_in"],
+                 rows_out=timings["bucket_rows"], jobs=timings["jobs"])
+    profiler.add("ingest.normalize", timings["normalize"] * 1000, rows_in=timings["bucket_rows"],
+                 rows_out=timings["bucket_rows"], jobs=timings["jobs"])
+
+
+def cube_from_frames(dfs, loss_dfs, profit_policy=DEFAULT_PROFIT_POLICY, approx_distinct=False, profiler=None):
+    """Join parsed route and rail frames and aggregate them into a Cube."""
+    with maybe_stage(profiler, "join", rows_in=sum(len(df) for df in dfs) + sum(len(df) for df in loss_dfs)) as stage:
+        df, join_report = join_shipments(dfs, loss_dfs, profit_policy)
+        stage.rows_out = len(df)
+    with maybe_stage(profiler, "cube", rows_in=len(df)) as stage:
+        cube = build_cube(df, approx_distinct=approx_distinct)
+        stage.rows_out = sum(len(frame) for frame in cube.summary.values())
+    cube.join_report = join_report
+    return cube
+
+
+def safe_name(route):
+    return re.sub(r"[^\w.-]+", "_", str(route)).strip("_") or "route"
+
+
+def save_chart(chart, path, formats):
+    for fmt in formats:
+        chart.save(str(path.with_suffix(f".{fmt}")))
+
+
+def route_charts(route, time_col, summary, profit_summary, pop_summary=None):
+    """Charts for one route and granularity, keyed by file stem."""
+    teu_range, cbm_range = AXIS_RANGES[time_col]
+    charts = {"volume": route_chart(summary[summary["route"] == route], route, time_col, teu_range, cbm_range)}
+    if profit_summary is not None:
+        profit_data = profit_summary[profit_summary["route"] == route]
+        if not profit_data.empty:
+            charts["profit"] = make_profit_chart(profit_data, route, time_col)
+            if pop_summary is not None:
+                charts["pop"] = make_wow_chart(pop_summary[pop_summary["route"] == route], time_col)
+    return charts
+
+
+def _write_route(route, frames, out_dir, formats):
+    # Runs in a worker: frames holds (time_col, summary, profit_summary, pop_summary) for one route.
+    written = []
+    for time_col, summary, profit_summary, pop_summary in frames:
+        target = Path(out_dir) / time_col / safe_name(route)
+        target.mkdir(parents=True, exist_ok=True)
+        for stem, chart in route_charts(route, time_col, summary, profit_summary, pop_summary).items():
+            save_chart(chart, target / stem, formats)
+            written.append(str(target / stem))
+    return written
+
+
+def write_report(cube, out_dir, formats=("html", "json"), time_cols=TIME_COLS, jobs=None, profiler=None):
+    """Write summary tables and every route's charts for each granularity.
+
+    Routes are rendered in parallel on ``jobs`` processes. Returns the
+    written chart paths without extension.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    with maybe_stage(profiler, "tables", rows_in=len(cube.routes)):
+        _write_tables(cube, out_dir, time_cols)
+    with maybe_stage(profiler, "charts", rows_in=len(cube.routes)) as stage:
+        written = _write_charts(cube, out_dir, formats, time_cols, jobs)
+        stage.rows_out = len(written)
+    return written
+
+
+def _write_tables(cube, out_dir, time_cols):
+    for time_col in time_cols:
+        cube.summary[time_col].to_csv(out_dir / f"summary_{time_col}.csv", index=False)
+        cube.agg_summary[time_col].to_csv(out_dir / f"agg_summary_{time_col}.csv", index=False)
+        if cube.has_profit:
+            cube.profit_summary[time_col].to_csv(out_dir / f"profit_summary_{time_col}.csv", index=False)
+            cube.pop_summary[time_col].to_csv(out_dir / f"pop_summary_{time_col}.csv", index=False)
+
+
+def _write_charts(cube, out_dir, formats, time_cols, jobs):
+    written = []
+    for time_col in time_cols:
+        target = out_dir / time_col / "ALL"
+        target.mkdir(parents=True, exist_ok=True)
+        save_chart(all_routes_chart(cube.summary[time_col], time_col, *AXIS_RANGES[time_col]), target / "volume", formats)
+        written.append(str(target / "volume"))
+        if cube.has_profit:
+            chart = all_profit_chart(cube.profit_summary[time_col], cube.routes, time_col)
+            if chart is not None:
+                save_chart(chart, target / "profit", formats)
+                written.append(str(target / "profit"))
+            save_chart(pop_heatmap(cube.pop_summary[time_col], time_col), target / "pop", formats)
+            written.append(str(target / "pop"))
+
+    work = []
+    for route in cube.routes:
+        frames = []
+        for time_col in time_cols:
+            summary = cube.summary[time_col]
+            profit = cube.profit_summary[time_col] if cube.has_profit else None
+            pop = cube.pop_summary[time_col] if cube.has_profit else None
+            frames.append((
+                time_col,
+                summary[summary["route"] == route],
+                profit[profit["route"] == route] if profit is not None else None,
+                pop[pop["route"] == route] if pop is not None else None,
+            ))
+        work.append((route, frames))
+
+    if jobs <= 1 or len(work) <= 1:
+        for route, frames in work:
+            written += _write_route(route, frames, out_dir, formats)
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(jobs, len(work)), mp_context=ctx) as pool:
+            futures = [pool.submit(_write_route, route, frames, out_dir, formats) for route, frames in work]
+            for future in futures:
+                written += future.result()
+    return written
@@ -0,0 +1,273 @@
+"""SQLite-backed shipment and profit history.
+
+Workbooks are ingested once (by content hash). Shipments are keyed on
+(route, Containerno, ETD, MMSCN): rows of one workbook that share a key
+have their CBM summed, as the upload path counts them, and a later
+workbook with the key replaces it, so a re-export with corrected CBM wins.
+
+Rail rows are kept per file (summed per MMSCN within a file), and
+``profits`` collapses them under every policy of lcl.join: sum over all
+rail files, or the rows of the first or latest one. The same uploads
+therefore give the same profit as the in-memory join under the same
+policy; only byte-identical re-uploads are not counted twice.
+``period_agg`` holds the per (grain, route, period) aggregates for each
+policy and only the buckets touched by an ingest are recomputed, so
+loading the history is a single query.
+"""
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from lcl.buckets import bucket_keys
+from lcl.cache import DEFAULT_CACHE_DIR, content_hash
+from lcl.cube import TIME_COLS, cube_from_periods
+from lcl.ingest import is_rail_file, iter_uploads
+from lcl.join import DEFAULT_PROFIT_POLICY, PROFIT_POLICIES
+
+DEFAULT_STORE_URL = os.environ.get("LCL_STORE_URL", f"sqlite:///{DEFAULT_CACHE_DIR / 'shipments.db'}")
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS files (
+        hash TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        loaded_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS shipments (
+        route TEXT NOT NULL,
+        containerno TEXT NOT NULL,
+        etd INTEGER NOT NULL,
+        mmscn TEXT NOT NULL,
+        cbm REAL,
+        weeknum INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        quarter INTEGER NOT NULL,
+        PRIMARY KEY (route, containerno, etd, mmscn)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_shipments_mmscn ON shipments (mmscn)",
+    "CREATE INDEX IF NOT EXISTS ix_shipments_weeknum ON shipments (route, weeknum)",
+    "CREATE INDEX IF NOT EXISTS ix_shipments_month ON shipments (route, month)",
+    "CREATE INDEX IF NOT EXISTS ix_shipments_quarter ON shipments (route, quarter)",
+    """CREATE TABLE IF NOT EXISTS rail_profits (
+        mmscn TEXT NOT NULL,
+        file_seq INTEGER NOT NULL,
+        shared_profit REAL,
+        PRIMARY KEY (mmscn, file_seq)
+    )""",
+    """CREATE TABLE IF NOT EXISTS profits (
+        mmscn TEXT PRIMARY KEY,
+        profit_sum REAL,
+        profit_first REAL,
+        profit_latest REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS period_agg (
+        grain TEXT NOT NULL,
+        route TEXT NOT NULL,
+        period INTEGER NOT NULL,
+        cbm REAL NOT NULL,
+        feu INTEGER NOT NULL,
+        profit_sum REAL,
+        profit_first REAL,
+        profit_latest REAL,
+        PRIMARY KEY (grain, route, period)
+    )""",
+]
+SHIPMENT_KEY = ["route", "containerno", "etd", "mmscn"]
+
+
+def key_text(values):
+    """Render key columns as text; integral floats lose their ".0", nulls become ""."""
+    def fmt(v):
+        if v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v)):
+            return ""
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return str(v)
+    return pd.Series([fmt(v) for v in values], index=values.index, dtype=object)
+
+
+def shipment_rows(df):
+    return pd.DataFrame({
+        "route": df["route"].astype(str),
+        "containerno": key_text(df["Containerno"]),
+        "etd": df["ETD"].astype("datetime64[ns]").astype("int64"),
+        "mmscn": key_text(df["MMSCN"]),
+        "cbm": df["Chrgb CBM"].astype("float64"),
+        "weeknum": df["weeknum"],
+        "month": df["month"],
+        "quarter": df["quarter"],
+    })
+
+
+def profit_rows(df):
+    rows = pd.DataFrame({
+        "mmscn": key_text(df["MMSCN"]),
+        "shared_profit": df["Shared_Profit"].astype("float64"),
+    })
+    return rows[rows["mmscn"] != ""]
+
+
+def collapse_shipments(rows):
+    """One row per shipment key: CBM summed within a file, the highest ``file`` winning."""
+    rows = rows.groupby(SHIPMENT_KEY + ["file"], as_index=False, sort=False).agg(
+        {"cbm": "sum", "weeknum": "first", "month": "first", "quarter": "first"})
+    rows = rows[rows["file"] == rows.groupby(SHIPMENT_KEY, sort=False)["file"].transform("max")]
+    return rows.drop(columns="file")[SHIPMENT_KEY + ["cbm", "weeknum", "month", "quarter"]]
+
+
+def collapse_rail(rows):
+    """One row per (MMSCN, file_seq), profit summed within the file."""
+    return rows.groupby(["mmscn", "file_seq"], as_index=False, sort=False)["shared_profit"].sum(min_count=1)
+
+
+class ShipmentStore:
+    def __init__(self, url=DEFAULT_STORE_URL):
+        if url.startswith("sqlite:///"):
+            os.makedirs(os.path.dirname(os.path.abspath(url[len("sqlite:///"):])), exist_ok=True)
+        self.engine = create_engine(url)
+        with self.engine.begin() as conn:
+            for stmt in SCHEMA:
+                conn.execute(text(stmt))
+
+    def revision(self):
+        """Changes whenever new files are ingested."""
+        with self.engine.connect() as conn:
+            return tuple(conn.execute(text("SELECT COUNT(*), MAX(loaded_at) FROM files")).one())
+
+    def known_files(self):
+        with self.engine.connect() as conn:
+            return {row[0] for row in conn.execute(text("SELECT hash FROM files"))}
+
+    def ingest(self, files, cache=None):
+        """Add uploads not seen before; returns how many files were new."""
+        known = self.known_files()
+        new = []
+        seen = set()
+        for file in files:
+            digest = content_hash(file.getvalue())
+            if digest not in known and digest not in seen:
+                seen.add(digest)
+                new.append((digest, file))
+        if not new:
+            return 0
+        entries = [None] * len(new)
+        for i, kind, df in iter_uploads([file for _, file in new], cache):
+            entries[i] = (kind, df)
+        # Upload order decides which file is the latest one, within a batch as across batches.
+        route_rows = [shipment_rows(df).assign(file=i) for i, (kind, df) in enumerate(entries)
+                      if kind == "route" and not df.empty]
+        shipments = collapse_shipments(pd.concat(route_rows, ignore_index=True)) if route_rows else None
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with self.engine.begin() as conn:
+            seq = conn.execute(text("SELECT COALESCE(MAX(file_seq), 0) FROM rail_profits")).scalar() + 1
+            rail_rows = [profit_rows(df).assign(file_seq=seq + i) for i, (kind, df) in enumerate(entries)
+                         if kind == "rail"]
+            profits = collapse_rail(pd.concat(rail_rows, ignore_index=True)) if rail_rows else None
+            self._upsert(conn, shipments, profits)
+            conn.execute(
+                text("INSERT OR IGNORE INTO files (hash, kind, name, loaded_at) VALUES (:hash, :kind, :name, :loaded_at)"),
+                [{"hash": digest, "kind": "rail" if is_rail_file(file.name) else "route", "name": file.name, "loaded_at": now}
+                 for digest, file in new],
+            )
+        return len(new)
+
+    def _upsert(self, conn, shipments, profits):
+        conn.execute(text("DROP TABLE IF EXISTS temp.affected"))
+        conn.execute(text("CREATE TEMP TABLE affected (route TEXT, weeknum INTEGER, month INTEGER, quarter INTEGER)"))
+        if shipments is not None and not shipments.empty:
+            shipments.to_sql("shipment_staging", conn, if_exists="replace", index=False)
+            conn.execute(text(
+                "INSERT INTO shipments SELECT * FROM shipment_staging WHERE true "
+                "ON CONFLICT (route, containerno, etd, mmscn) DO UPDATE SET cbm = excluded.cbm"
+            ))
+            conn.execute(text("INSERT INTO affected SELECT DISTINCT route, weeknum, month, quarter FROM shipment_staging"))
+            conn.execute(text("DROP TABLE shipment_staging"))
+        if profits is not None and not profits.empty:
+            profits.to_sql("profit_staging", conn, if_exists="replace", index=False)
+            conn.execute(text("INSERT INTO rail_profits SELECT mmscn, file_seq, shared_profit FROM profit_staging"))
+            self._collapse_profits(conn, "SELECT mmscn FROM profit_staging")
+            conn.execute(text(
+                "INSERT INTO affected SELECT DISTINCT route, weeknum, month, quarter FROM shipments "
+                "WHERE mmscn IN (SELECT mmscn FROM profit_staging)"
+            ))
+            conn.execute(text("DROP TABLE profit_staging"))
+        self._refresh_periods(conn)
+
+    def _collapse_profits(self, conn, mmscns):
+        """Recompute the per-policy profit of the MMSCNs selected by ``mmscns``."""
+        conn.execute(text(
+            "INSERT INTO profits (mmscn, profit_sum, profit_first, profit_latest) "
+            "SELECT b.mmscn, b.total, f.shared_profit, l.shared_profit FROM ("
+            "  SELECT mmscn, SUM(shared_profit) AS total, MIN(file_seq) AS lo, MAX(file_seq) AS hi "
+            f"  FROM rail_profits WHERE mmscn IN ({mmscns}) GROUP BY mmscn) b "
+            "JOIN rail_profits f ON f.mmscn = b.mmscn AND f.file_seq = b.lo "
+            "JOIN rail_profits l ON l.mmscn = b.mmscn AND l.file_seq = b.hi "
+            "WHERE true "
+            "ON CONFLICT (mmscn) DO UPDATE SET profit_sum = excluded.profit_sum, "
+            "profit_first = excluded.profit_first, profit_latest = excluded.profit_latest"
+        ))
+
+    def _refresh_periods(self, conn):
+        """Recompute the period_agg rows of the buckets listed in temp.affected, then drop it.
+
+        Each grain starts from its few touched (route, period) buckets and
+        reaches their shipments through ix_shipments_<grain>, so the work
+        follows the buckets an ingest touched, not the size of the history.
+        """
+        for grain in TIME_COLS:
+            conn.execute(text("DROP TABLE IF EXISTS temp.touched"))
+            conn.execute(text("CREATE TEMP TABLE touched (route TEXT, period INTEGER, PRIMARY KEY (route, period))"))
+            conn.execute(text(f"INSERT OR IGNORE INTO touched SELECT route, {grain} FROM affected"))
+            conn.execute(
+                text("DELETE FROM period_agg WHERE grain = :grain AND (route, period) IN (SELECT route, period FROM touched)"),
+                {"grain": grain},
+            )
+            # CROSS JOIN keeps touched as the outer loop.
+            conn.execute(text(
+                f"INSERT INTO period_agg (grain, route, period, cbm, feu, profit_sum, profit_first, profit_latest) "
+                f"SELECT :grain, t.route, t.period, COALESCE(SUM(s.cbm), 0), "
+                f"COUNT(DISTINCT s.containerno || '|' || s.etd), "
+                f"SUM(p.profit_sum), SUM(p.profit_first), SUM(p.profit_latest) "
+                f"FROM touched t CROSS JOIN shipments s LEFT JOIN profits p ON p.mmscn = s.mmscn "
+                f"WHERE s.route = t.route AND s.{grain} = t.period "
+                f"GROUP BY t.route, t.period"
+            ), {"grain": grain})
+            conn.execute(text("DROP TABLE temp.touched"))
+        conn.execute(text("DROP TABLE temp.affected"))
+
+    def has_profit(self):
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT EXISTS (SELECT 1 FROM profits)")).scalar() == 1
+
+    def periods(self, since=None, policy=DEFAULT_PROFIT_POLICY):
+        """Per-grain aggregate frames, optionally only periods from ``since`` on.
+
+        Duplicate MMSCNs across rail files are resolved by ``policy``, as in lcl.join.
+        """
+        if policy not in PROFIT_POLICIES:
+            raise ValueError(f"Unknown profit policy {policy!r}, expected one of {PROFIT_POLICIES}")
+        with self.engine.connect() as conn:
+            agg = pd.read_sql(text(f"SELECT grain, route, period, cbm, feu, profit_{policy} AS profit FROM period_agg"), conn)
+        has_profit = self.has_profit()
+        if since is not None:
+            first = dict(zip(TIME_COLS, (int(k[0]) for k in bucket_keys(pd.Series([pd.Timestamp(since)])))))
+        periods = {}
+        for grain in TIME_COLS:
+            frame = agg[agg["grain"] == grain]
+            if since is not None:
+                frame = frame[frame["period"] >= first[grain]]
+            frame = frame.rename(columns={"period": grain, "cbm": "Chrgb CBM", "feu": "FEU", "profit": "Shared_Profit"})
+            frame = frame.drop(columns="grain")
+            if has_profit:
+                frame["Shared_Profit"] = frame["Shared_Profit"].fillna(0.0)
+            else:
+                frame = frame.drop(columns="Shared_Profit")
+            periods[grain] = frame.reset_index(drop=True)
+        return periods
+
+    def load_cube(self, since=None, policy=DEFAULT_PROFIT_POLICY):
+        return cube_from_periods(self.periods(since, policy))
+
@@ -0,0 +1,39 @@
+"""Synthetic shipments shared by the cube, distinct-count and join tests."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from lcl.buckets import add_buckets
+from lcl.join import join_shipments
+from lcl.normalize import normalize_shipments
+
+
+def make_shipments(rows=20_000, seed=0):
+    """Return (route rows, rail rows) as plain object/float64 frames."""
+    rng = np.random.default_rng(seed)
+    # Departures around two year ends, so weeks and quarters straddle them.
+    days = pd.date_range("2023-11-01", "2025-02-28").to_numpy()
+    etd = pd.Series(rng.choice(days, rows))
+    etd[rng.random(rows) < 0.01] = pd.NaT
+    containers = rng.integers(0, rows // 6, rows)
+    df = pd.DataFrame({
+        "route": rng.choice(["XIAN-HAM", "WUHAN-LODZ", "CHONGQING-DUI"], rows),
+        "ETD": etd,
+        "Chrgb CBM": np.round(rng.lognormal(1.2, 0.9, rows), 2),
+        # Mixed int and str container numbers, as in real workbooks.
+        "Containerno": np.where(containers % 5 == 0, containers, np.char.add("TGHU", containers.astype(str))).astype(object),
+        "MMSCN": np.char.add("SH", np.arange(rows).astype(str)),
+    })
+    rail = pd.DataFrame({
+        "MMSCN": df["MMSCN"].sample(frac=0.7, random_state=seed).to_numpy(),
+        "Shared_Profit": np.round(rng.normal(50, 200, int(rows * 0.7)), 2),
+    })
+    return df, rail
+
+
+@pytest.fixture(scope="session")
+def shipments():
+    """(route rows, rail rows, the compact joined frame build_cube takes)."""
+    df, rail = make_shipments()
+    joined, _ = join_shipments([normalize_shipments(add_buckets(df))], [normalize_shipments(rail)])
+    return df, rail, joined
@@ -0,0 +1,24 @@
+"""Integer period keys against the strftime/to_period strings they replace."""
+import pandas as pd
+
+from lcl.buckets import add_buckets, bucket_keys, label_buckets
+
+
+def test_week_keys_follow_strftime():
+    days = pd.Series(pd.date_range("2015-01-01", "2030-12-31"))
+    week, month, quarter = bucket_keys(days)
+    assert (week == days.dt.year * 100 + days.dt.strftime("%U").astype(int) + 1).all()
+    assert (month == days.dt.year * 100 + days.dt.month).all()
+    assert (quarter == days.dt.year * 10 + days.dt.quarter).all()
+
+
+def test_labels_match_periods():
+    days = pd.Series(pd.date_range("2023-12-25", "2024-01-08"))
+    df = add_buckets(pd.DataFrame({"ETD": pd.concat([days, pd.Series([pd.NaT])], ignore_index=True)}))
+    # Rows without an ETD are dropped rather than bucketed.
+    assert len(df) == len(days)
+    assert label_buckets("month", df["month"]).tolist() == days.dt.to_period("M").astype(str).tolist()
+    assert label_buckets("quarter", df["quarter"]).tolist() == days.dt.to_period("Q").astype(str).tolist()
+    weeks = label_buckets("weeknum", df["weeknum"])
+    # Dec 31 2023 and Jan 1 2024 fall in different years' weeks.
+    assert weeks.iloc[6] == "2023-W54" and weeks.iloc[7] == "2024-W01"
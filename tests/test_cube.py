@@ -0,0 +1,45 @@
+"""build_cube against the original drop_duplicates/groupby report."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from lcl.buckets import add_buckets, label_buckets
+from lcl.cube import TIME_COLS, build_cube
+
+
+def reference(df, rail, time_col):
+    """The report's original aggregation, on plain object/float64 columns."""
+    df = add_buckets(df).merge(rail, on="MMSCN", how="left")
+    keys = ["route", time_col]
+    cbm = df.groupby(keys)["Chrgb CBM"].sum()
+    feu = df.drop_duplicates(subset=["route", "Containerno", "ETD", time_col]).groupby(keys).size().rename("FEU")
+    profit = df.groupby(keys)["Shared_Profit"].sum()
+    out = pd.concat([cbm, feu, profit], axis=1).reset_index()
+    out[time_col] = label_buckets(time_col, out[time_col])
+    return out.sort_values(keys, ignore_index=True)
+
+
+@pytest.mark.parametrize("time_col", TIME_COLS)
+def test_build_cube_matches_groupby(shipments, time_col):
+    df, rail, joined = shipments
+    cube = build_cube(joined)
+    expected = reference(df, rail, time_col)
+    summary = cube.summary[time_col].sort_values(["route", time_col], ignore_index=True)
+    profit = cube.profit_summary[time_col].sort_values(["route", time_col], ignore_index=True)
+    assert summary["FEU"].tolist() == expected["FEU"].tolist()
+    assert summary[time_col].tolist() == expected[time_col].tolist()
+    np.testing.assert_allclose(summary["Chrgb CBM"], expected["Chrgb CBM"], rtol=1e-12)
+    np.testing.assert_allclose(profit["Shared_Profit"], expected["Shared_Profit"], rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize("time_col", TIME_COLS)
+def test_route_totals_match_groupby(shipments, time_col):
+    df, rail, joined = shipments
+    expected = reference(df, rail, time_col)
+    expected["TEU"] = expected["FEU"] * 2
+    expected["AVG L/D"] = expected["Chrgb CBM"] / expected["FEU"] / 76.3 * 100
+    expected = expected.groupby("route", as_index=False).agg({"TEU": "sum", "Chrgb CBM": "sum", "AVG L/D": "mean"})
+    got = build_cube(joined).agg_summary[time_col].sort_values("route", ignore_index=True)
+    assert got["route"].tolist() == expected["route"].tolist()
+    assert got["TEU"].tolist() == expected["TEU"].tolist()
+    np.testing.assert_allclose(got[["Chrgb CBM", "AVG L/D"]], expected[["Chrgb CBM", "AVG L/D"]], rtol=1e-12)
@@ -0,0 +1,48 @@
+"""Shared dataset leases, zero-copy views and eviction."""
+import gc
+
+import pytest
+
+from lcl.cube import build_cube
+from lcl.datasets import DatasetRegistry
+
+
+@pytest.fixture(scope="module")
+def cube(shipments):
+    return build_cube(shipments[2])
+
+
+def buffer_address(frame, col):
+    return frame[col].array._pa_array.chunks[0].buffers()[1].address
+
+
+def test_leases_share_buffers(cube):
+    registry = DatasetRegistry()
+    first = registry.put("k", cube)
+    second = registry.lease("k")
+    assert registry.stats()["leases"] == 2
+    a, b = first.cube.summary["month"], second.cube.summary["month"]
+    assert buffer_address(a, "Chrgb CBM") == buffer_address(b, "Chrgb CBM")
+    # A session's edit stays in its own view.
+    a["Chrgb CBM"] = 0.0
+    assert b["Chrgb CBM"].sum() > 0
+    assert registry.lease("missing") is None
+    assert registry.stats()["hits"] == 1 and registry.stats()["misses"] == 1
+
+
+def test_released_datasets_are_evicted_over_budget(cube):
+    registry = DatasetRegistry(max_bytes=1)
+    old = registry.put("old", cube)
+    kept = registry.put("kept", cube)
+    # Both are leased, so both stay even though the budget is exceeded.
+    assert registry.stats()["datasets"] == 2
+    old.release()
+    assert registry.lease("old") is None
+    again = registry.lease("kept")
+    # Garbage-collected leases release their hold too.
+    del kept
+    gc.collect()
+    assert registry.stats()["leases"] == 1
+    del again
+    gc.collect()
+    assert registry.stats()["datasets"] == 0
@@ -0,0 +1,26 @@
+"""FEU counts against drop_duplicates on the four key columns."""
+import pytest
+
+from lcl.buckets import add_buckets
+from lcl.cube import TIME_COLS, build_cube
+
+
+def reference_feu(df, time_col):
+    keys = ["route", time_col]
+    feu = add_buckets(df).drop_duplicates(subset=["route", "Containerno", "ETD", time_col]).groupby(keys).size()
+    return feu.sort_index().tolist()
+
+
+@pytest.mark.parametrize("time_col", TIME_COLS)
+def test_exact_feu_matches_drop_duplicates(shipments, time_col):
+    df, _, joined = shipments
+    # Cube rows are sorted by route and period key, like the groupby.
+    assert build_cube(joined).summary[time_col]["FEU"].tolist() == reference_feu(df, time_col)
+
+
+@pytest.mark.parametrize("time_col", TIME_COLS)
+def test_approx_feu_is_close(shipments, time_col):
+    _, _, joined = shipments
+    exact = build_cube(joined).summary[time_col]["FEU"].sum()
+    approx = build_cube(joined, approx_distinct=True).summary[time_col]["FEU"].sum()
+    assert abs(approx - exact) / exact < 0.05
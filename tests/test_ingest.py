@@ -0,0 +1,44 @@
+"""Upload parsing in process and on the worker pool."""
+import io
+
+import numpy as np
+import pytest
+import xlsxwriter
+
+from benchmarks.generate import ROUTE_HEADER, _write_rows, route_frame
+from lcl import ingest
+
+
+class Upload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+@pytest.fixture(scope="module")
+def routes():
+    out = io.BytesIO()
+    workbook = xlsxwriter.Workbook(out)
+    date = workbook.add_format({"num_format": "yyyy-mm-dd"})
+    rng = np.random.default_rng(0)
+    for i, name in enumerate(["XIAN-HAM", "WUHAN-LODZ"]):
+        _write_rows(workbook.add_worksheet(name), ROUTE_HEADER, route_frame(i, 2024, 500, rng), {"ETD": date})
+    # Rows, but not one valid ETD: parsed, yet it yields no shipments.
+    no_etd = route_frame(2, 2024, 20, rng)
+    no_etd["ETD"] = np.array([None] * 20, dtype=object)
+    _write_rows(workbook.add_worksheet("NO-ETD"), ROUTE_HEADER, no_etd, {})
+    workbook.close()
+    return Upload(out.getvalue(), "routes_2024.xlsx")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_progress_reports_every_parsed_sheet(monkeypatch, routes, workers):
+    # One job per sheet, on the pool when workers > 1.
+    monkeypatch.setattr(ingest, "SPLIT_SHEETS_BYTES", 0)
+    monkeypatch.setattr(ingest, "PARALLEL_MIN_BYTES", 0)
+    seen = []
+    results = list(ingest.iter_uploads([routes], workers=workers, progress=lambda i, sheet: seen.append((i, sheet))))
+    assert sorted(seen) == [(0, "NO-ETD"), (0, "WUHAN-LODZ"), (0, "XIAN-HAM")]
+    [(i, kind, df)] = results
+    assert kind == "route"
+    assert set(df["route"]) == {"XIAN-HAM", "WUHAN-LODZ"}
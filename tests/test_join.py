@@ -0,0 +1,42 @@
+"""Profit join policies and their JoinReport counts."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from lcl.join import join_shipments
+from lcl.normalize import normalize_shipments
+
+
+def route_frame():
+    return normalize_shipments(pd.DataFrame({
+        "route": ["XIAN-HAM"] * 4,
+        "Chrgb CBM": [1.0, 2.0, 3.0, 4.0],
+        "MMSCN": ["A", "B", "C", "A"],
+    }))
+
+
+def rail_frames():
+    first = pd.DataFrame({"MMSCN": ["A", "B", "B", "D", None], "Shared_Profit": [10.0, 5.0, 1.0, 7.0, 99.0]})
+    latest = pd.DataFrame({"MMSCN": ["A", "B"], "Shared_Profit": [20.0, 3.0]})
+    return [normalize_shipments(first), normalize_shipments(latest)]
+
+
+@pytest.mark.parametrize("policy, a, b", [("sum", 30.0, 9.0), ("latest", 20.0, 3.0), ("first", 10.0, 6.0)])
+def test_profit_policies(policy, a, b):
+    df, report = join_shipments([route_frame()], rail_frames(), policy)
+    # One profit per MMSCN: shipment rows are never multiplied.
+    assert len(df) == 4
+    assert df["Chrgb CBM"].sum() == 10.0
+    np.testing.assert_array_equal(df["Shared_Profit"], [a, b, np.nan, a])
+    assert report.as_dict() == {"matched": 2, "missing": 1, "duplicated": 2, "unused": 1}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        join_shipments([route_frame()], rail_frames(), "max")
+
+
+def test_without_rail_files():
+    df, report = join_shipments([route_frame()], [])
+    assert report is None
+    assert "Shared_Profit" not in df.columns
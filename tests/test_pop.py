@@ -0,0 +1,55 @@
+"""Period-over-period and year-over-year alignment across year ends."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from lcl.buckets import bucket_keys, period_ordinal
+from lcl.cube import TIME_COLS
+from lcl.pop import ALL_ROUTES, period_changes
+
+
+@pytest.mark.parametrize("time_col", TIME_COLS)
+def test_period_ordinals_are_consecutive(time_col):
+    days = pd.Series(pd.date_range("2015-01-01", "2030-12-31"))
+    keys = dict(zip(TIME_COLS, bucket_keys(days)))[time_col]
+    ordinals = period_ordinal(time_col, np.unique(keys))
+    assert (np.diff(ordinals) == 1).all()
+
+
+def changes(time_col, rows):
+    frame = pd.DataFrame(rows, columns=["route", time_col, "Shared_Profit"])
+    out = period_changes(frame, time_col)
+    return {(r.route, getattr(r, time_col)): r for r in out.itertuples()}
+
+
+def test_weeks_compare_across_the_year_end():
+    # 2023 ends in week 54 (Dec 31 is a Sunday) and 2024 starts in week 1.
+    out = changes("weeknum", [
+        ("XIAN-HAM", 202253, 40.0),
+        ("XIAN-HAM", 202353, -20.0),
+        ("XIAN-HAM", 202354, -50.0),
+        ("XIAN-HAM", 202401, 100.0),
+        ("WUHAN-LODZ", 202352, 30.0),
+        ("WUHAN-LODZ", 202401, 60.0),
+    ])
+    new_year = out["XIAN-HAM", "2024-W01"]
+    assert new_year.pop_delta == 150.0 and new_year.pop_pct == 3.0
+    # Week 1 of 2023 never had a row, so there is nothing to compare with.
+    assert np.isnan(new_year.yoy_delta)
+    assert out["XIAN-HAM", "2023-W54"].pop_delta == -30.0
+    assert out["XIAN-HAM", "2023-W53"].yoy_delta == -60.0
+    # Week 53 of 2023 has no row: the change is missing, not taken from week 52.
+    assert np.isnan(out["WUHAN-LODZ", "2024-W01"].pop_delta)
+    total = out[ALL_ROUTES, "2024-W01"]
+    assert total.Shared_Profit == 160.0 and total.pop_delta == 210.0
+
+
+def test_months_and_quarters_compare_across_the_year_end():
+    months = changes("month", [("XIAN-HAM", 202301, 20.0), ("XIAN-HAM", 202312, 80.0), ("XIAN-HAM", 202401, 40.0)])
+    january = months["XIAN-HAM", "2024-01"]
+    assert january.pop_delta == -40.0 and january.pop_pct == -0.5
+    assert january.yoy_delta == 20.0 and january.yoy_pct == 1.0
+    quarters = changes("quarter", [("XIAN-HAM", 20234, 10.0), ("XIAN-HAM", 20241, 5.0), ("XIAN-HAM", 20244, 15.0)])
+    assert quarters["XIAN-HAM", "2024Q1"].pop_delta == -5.0
+    assert quarters["XIAN-HAM", "2024Q4"].yoy_delta == 5.0
+    assert np.isnan(quarters["XIAN-HAM", "2024Q4"].pop_delta)
@@ -0,0 +1,69 @@
+"""Streamed sheet projection against pd.read_excel."""
+import datetime
+import io
+
+import pandas as pd
+import pytest
+import xlsxwriter
+
+from lcl.reader import ENGINES, iter_sheets
+
+HEADER = ["ETD", "Chrgb CBM", "Formula", None, "Formula", "MMSCN"]
+ROWS = [
+    [datetime.datetime(2024, 1, 2), 1.5, "TGHU1", "x", 10, "SH1"],
+    [datetime.datetime(2024, 12, 31), "", 12345, None, -2.25, "SH2"],
+    [None, 3, "TGHU3", "y", "", 77],
+]
+COLUMNS = {"ETD": "datetime", "Chrgb CBM": "float", "Formula": "raw", "Formula.1": "float",
+           "Unnamed: 4": "raw", "MMSCN": "raw", 3: "raw", 6: "raw", "Missing": "raw"}
+
+
+@pytest.fixture(scope="module")
+def workbook():
+    out = io.BytesIO()
+    book = xlsxwriter.Workbook(out)
+    date = book.add_format({"num_format": "yyyy-mm-dd"})
+    # Column A is blank throughout; "offset" also starts two rows down.
+    for name, first_row in [("blank-column", 0), ("offset", 2)]:
+        sheet = book.add_worksheet(name)
+        for r, row in enumerate([HEADER] + ROWS):
+            for c, value in enumerate(row):
+                if isinstance(value, datetime.datetime):
+                    sheet.write_datetime(first_row + r, c + 1, value, date)
+                elif value is not None:
+                    sheet.write(first_row + r, c + 1, value)
+    book.close()
+    return out.getvalue()
+
+
+def expected_column(df, col, kind):
+    values = df.iloc[:, col] if isinstance(col, int) else df[col]
+    if kind == "datetime":
+        return pd.to_datetime(values, errors="coerce")
+    if kind == "float":
+        return pd.to_numeric(values, errors="coerce").astype("float64")
+    return values
+
+
+def as_list(values):
+    return [None if pd.isna(v) else v for v in values]
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_columns_match_read_excel(workbook, engine):
+    sheets = dict(iter_sheets(workbook, COLUMNS, engine=engine))
+    assert list(sheets) == ["blank-column", "offset"]
+    for name, got in sheets.items():
+        expected = pd.read_excel(io.BytesIO(workbook), sheet_name=name)
+        # The reader drops rows that are empty in every projected column.
+        expected = expected[expected.notna().any(axis=1)].reset_index(drop=True)
+        found = [col for col in COLUMNS if isinstance(col, int) and col < expected.shape[1] or col in expected.columns]
+        assert got.attrs["found"] == found
+        assert len(got) == len(expected)
+        for col in found:
+            want = expected_column(expected, col, COLUMNS[col])
+            if COLUMNS[col] == "raw":
+                assert as_list(got[col]) == as_list(want), col
+            else:
+                # Engines differ in datetime resolution, not in values.
+                pd.testing.assert_series_equal(got[col].astype(want.dtype), want, check_names=False)
@@ -0,0 +1,80 @@
+"""ShipmentStore against the in-memory report."""
+import pandas as pd
+import pytest
+
+from benchmarks.generate import generate
+from lcl.join import PROFIT_POLICIES
+from lcl.report import WorkbookFile, build_report
+from lcl.store import ShipmentStore
+
+
+@pytest.fixture(scope="module")
+def workbooks(tmp_path_factory):
+    out = tmp_path_factory.mktemp("workbooks")
+    paths = generate(out, 3000, routes=3)
+    # A second rail file re-costing half of the shipments, with a row repeated.
+    rail = pd.read_excel(paths[-1])
+    rerun = rail.iloc[: len(rail) // 2].copy()
+    rerun["Formula.7"] = rerun["Formula.7"] * 3 + 1
+    pd.concat([rerun, rerun.iloc[:5]]).to_excel(out / "Rail_profit_rerun.xlsx", index=False)
+    return [WorkbookFile(p) for p in paths + [out / "Rail_profit_rerun.xlsx"]]
+
+
+def assert_same(expected, got):
+    for time_col in expected.summary:
+        pd.testing.assert_frame_equal(got.summary[time_col], expected.summary[time_col], check_dtype=False)
+        columns = ["route", time_col, "Shared_Profit"]
+        pd.testing.assert_frame_equal(
+            got.profit_summary[time_col][columns].reset_index(drop=True),
+            expected.profit_summary[time_col][columns].reset_index(drop=True),
+            check_dtype=False,
+        )
+
+
+@pytest.mark.parametrize("batches", [1, 4])
+def test_store_matches_in_memory_report(tmp_path, workbooks, batches):
+    store = ShipmentStore(f"sqlite:///{tmp_path / 'shipments.db'}")
+    size = -(-len(workbooks) // batches)
+    for i in range(0, len(workbooks), size):
+        store.ingest(workbooks[i:i + size])
+    for policy in PROFIT_POLICIES:
+        assert_same(build_report(workbooks, policy, workers=1), store.load_cube(policy=policy))
+
+
+def test_reingest_replaces_shipment_cbm(tmp_path, workbooks):
+    store = ShipmentStore(f"sqlite:///{tmp_path / 'shipments.db'}")
+    store.ingest(workbooks)
+    route_path = workbooks[0].path
+    sheets = pd.read_excel(route_path, sheet_name=None)
+    for df in sheets.values():
+        if "Chrgb CBM" in df.columns:
+            df["Chrgb CBM"] = df["Chrgb CBM"] * 2
+    fixed = tmp_path / route_path.name
+    with pd.ExcelWriter(fixed) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    store.ingest([WorkbookFile(fixed)])
+    expected = build_report([WorkbookFile(fixed)] + workbooks[1:], workers=1)
+    assert_same(expected, store.load_cube())
+
+
+def test_known_files_are_skipped(tmp_path, workbooks):
+    store = ShipmentStore(f"sqlite:///{tmp_path / 'shipments.db'}")
+    assert store.ingest(workbooks[:2]) == 2
+    revision = store.revision()
+    assert store.ingest(workbooks[:2]) == 0
+    assert store.revision() == revision
+    assert store.ingest(workbooks) == len(workbooks) - 2
+    assert store.revision() != revision
+
+
+def test_since_keeps_later_periods(tmp_path, workbooks):
+    store = ShipmentStore(f"sqlite:///{tmp_path / 'shipments.db'}")
+    store.ingest(workbooks)
+    since = "2024-07-01"
+    full = store.periods()
+    recent = store.periods(since=since)
+    for time_col, first in [("weeknum", 202427), ("month", 202407), ("quarter", 20243)]:
+        expected = full[time_col][full[time_col][time_col] >= first].reset_index(drop=True)
+        assert len(expected) and len(expected) < len(full[time_col])
+        pd.testing.assert_frame_equal(recent[time_col], expected)